@@ -1,17 +1,19 @@
 from __future__ import annotations
 
-import pathlib
 from typing import TYPE_CHECKING, Optional, Union, ClassVar
 from io import BytesIO
 import asyncio
+import functools
 import random
 import re
+import threading
 
 import discord
 from discord.ext import commands
 from PIL import Image, ImageDraw
 
 from .utils import *
+from .encoding import encode, filename
 
 if TYPE_CHECKING:
     Coords = tuple[int, int]
@@ -27,6 +29,34 @@ SHIPS: dict[str, tuple[int, tuple[int, int, int]]] = {
         (190, 190, 190)),
 }
 
+# every board is a 10x10 grid of bits, coordinate (x, y) is bit (x - 1) * 10 + (y - 1)
+def coord_index(coord: Coords) -> int:
+    return (coord[0] - 1) * 10 + (coord[1] - 1)
+
+def coord_bit(coord: Coords) -> int:
+    return 1 << coord_index(coord)
+
+def iter_coords(bits: int) -> list[Coords]:
+    coords = []
+    while bits:
+        low = bits & -bits
+        index = low.bit_length() - 1
+        coords.append((index // 10 + 1, index % 10 + 1))
+        bits ^= low
+    return coords
+
+RED = (255, 0, 0)
+GRAY = (128, 128, 128)
+
+@functools.lru_cache(maxsize=None)
+def _get_background() -> Image.Image:
+    # decoded once and shared by every board, it must never be drawn on
+    with Image.open(ASSETS_DIR / 'battleship.png') as img:
+        return img.convert('RGBA')
+
+def _cell_center(coord: Coords) -> tuple[int, int]:
+    return 75 + (coord[1] - 1) * 50, 75 + (coord[0] - 1) * 50
+
 class Ship:
 
     def __init__(
@@ -58,7 +88,19 @@ class Ship:
             ]
         )
 
-        self.hits: list[bool] = [False] * self.size
+        self.mask: int = 0
+        for coord in self.span:
+            self.mask |= coord_bit(coord)
+
+        self.hit_mask: int = 0
+
+    @property
+    def hits(self) -> list[bool]:
+        return [bool(self.hit_mask & coord_bit(coord)) for coord in self.span]
+
+    @property
+    def sunk(self) -> bool:
+        return self.hit_mask == self.mask
 
 class Board:
 
@@ -67,28 +109,63 @@ class Board:
         self.player: discord.Member = player
         self.ships: list[Ship] = []
 
-        self.my_hits: list[Coords] = []
-        self.my_misses: list[Coords] = []
+        # bitboards of the ships, and of the shots this player made (my) and received (op)
+        self.ship_mask: int = 0
+        self.my_hit_mask: int = 0
+        self.my_miss_mask: int = 0
+        self.op_hit_mask: int = 0
+        self.op_miss_mask: int = 0
 
-        self.op_hits: list[Coords] = []
-        self.op_misses: list[Coords] = []
+        # the ship on each of the 100 bits
+        self._ship_index: list[Optional[Ship]] = [None] * 100
+
+        # render layers, see `to_image`
+        self._ship_layer: Optional[Image.Image] = None
+        self._overlay: Optional[Image.Image] = None
+        self._stamped: int = 0
+        self._render_lock = threading.Lock()
 
         if random:
             self._place_ships()
 
+    @property
+    def my_hits(self) -> list[Coords]:
+        return iter_coords(self.my_hit_mask)
+
+    @property
+    def my_misses(self) -> list[Coords]:
+        return iter_coords(self.my_miss_mask)
+
+    @property
+    def op_hits(self) -> list[Coords]:
+        return iter_coords(self.op_hit_mask)
+
+    @property
+    def op_misses(self) -> list[Coords]:
+        return iter_coords(self.op_miss_mask)
+
+    @property
+    def move_mask(self) -> int:
+        return self.my_hit_mask | self.my_miss_mask
+
     @property
     def moves(self) -> list[Coords]:
-        return self.my_hits + self.my_misses
+        return iter_coords(self.move_mask)
 
     def _is_valid(self, ship: Ship) -> bool:
 
         if ship.end[0] > 10 or ship.end[1] > 10:
             return False
 
-        for existing in self.ships:
-            if any(c in existing.span for c in ship.span):
-                return False
-        return True
+        return not ship.mask & self.ship_mask
+
+    def add_ship(self, ship: Ship) -> None:
+        self.ships.append(ship)
+        self.ship_mask |= ship.mask
+        self._ship_layer = None
+
+        for coord in ship.span:
+            self._ship_index[coord_index(coord)] = ship
 
     def _place_ships(self) -> None:
 
@@ -105,15 +182,27 @@ class Board:
             )
 
             if self._is_valid(new_ship):
-                self.ships.append(new_ship)
+                self.add_ship(new_ship)
             else:
                 place_ship(ship, size, color)
 
         for ship, (size, color) in SHIPS.items():
             place_ship(ship, size, color)
 
+    def receive_shot(self, coord: Coords) -> Optional[Ship]:
+        """
+        Records a shot of the opponent, and returns the ship that was hit if any.
+        """
+        bit = coord_bit(coord)
+        if ship := self._ship_index[coord_index(coord)]:
+            ship.hit_mask |= bit
+            self.op_hit_mask |= bit
+        else:
+            self.op_miss_mask |= bit
+        return ship
+
     def won(self) -> bool:
-        return all(all(ship.hits) for ship in self.ships)
+        return not self.ship_mask & ~self.op_hit_mask
 
     def draw_dot(self, cur: ImageDraw.Draw, x: int, y: int, fill: Union[int, tuple[int, ...]]) -> None:
         x1, y1 = x - 10, y - 10
@@ -144,44 +233,39 @@ class Board:
         cur.rounded_rectangle((x1, y1, x2, y2), radius=5, fill=ship.color)
 
     def get_ship(self, coord: Coords) -> Optional[Ship]:
-        if s := [ship for ship in self.ships if coord in ship.span]:
-            return s[0]
+        return self._ship_index[coord_index(coord)]
     
+    def _get_ship_layer(self) -> Image.Image:
+        # the background with every ship drawn on it, ships only change during setup
+        if self._ship_layer is None:
+            layer = _get_background().copy()
+            cur = ImageDraw.Draw(layer)
+            for ship in self.ships:
+                for coord in ship.span:
+                    self.draw_sq(cur, *_cell_center(coord), coord=coord, ship=ship)
+            self._ship_layer = layer
+        return self._ship_layer
+
+    def _stamp_shots(self) -> None:
+        # only the shots received since the last render are drawn onto the overlay
+        if self._overlay is None:
+            self._overlay = Image.new('RGBA', _get_background().size, (0, 0, 0, 0))
+
+        new = (self.op_hit_mask | self.op_miss_mask) & ~self._stamped
+        if new:
+            cur = ImageDraw.Draw(self._overlay)
+            for coord in iter_coords(new):
+                fill = RED if coord_bit(coord) & self.op_hit_mask else GRAY
+                self.draw_dot(cur, *_cell_center(coord), fill=fill)
+            self._stamped |= new
+
     @executor()
     def to_image(self, hide: bool = False) -> BytesIO:
-        RED = (255, 0, 0)
-        GRAY = (128, 128, 128)
-
-        with Image.open(fr'{pathlib.Path(__file__).parent}\assets\battleship.png') as img:
-            cur = ImageDraw.Draw(img)
-            
-            for i, y in zip(
-                range(1, 11), range(75, 530, 50)
-            ):
-                for j, x in zip(
-                    range(1, 11), range(75, 530, 50)
-                ):
-                    coord = (i, j)
-                    if coord in self.op_misses:
-                        self.draw_dot(cur, x, y, fill=GRAY)
-
-                    elif coord in self.op_hits:
-                        if hide:
-                            self.draw_dot(cur, x, y, fill=RED)
-                        else:
-                            ship = self.get_ship(coord)
-                            self.draw_sq(cur, x, y, coord=coord, ship=ship)
-                            self.draw_dot(cur, x, y, fill=RED)
-
-                    elif ship := self.get_ship(coord):
-                        if not hide:
-                            self.draw_sq(cur, x, y, coord=coord, ship=ship)
-            buffer = BytesIO()
-            img.save(buffer, 'PNG')
-
-        buffer.seek(0)
-        del img
-        return buffer
+        with self._render_lock:
+            self._stamp_shots()
+            base = _get_background() if hide else self._get_ship_layer()
+            image = Image.alpha_composite(base, self._overlay)
+        return encode(image)
 
 
 class BattleShip:
@@ -225,17 +309,12 @@ class BattleShip:
     def place_move(self, player: discord.Member, coords: Coords) -> tuple[bool, bool]:
         board = self.get_board(player)
         op_board = self.get_board(player, other=True)
-        
-        for i, ship in enumerate(op_board.ships):
-            for j, coord in enumerate(ship.span):
-                if coords == coord:
-                    op_board.ships[i].hits[j] = True
-                    board.my_hits.append(coords)
-                    op_board.op_hits.append(coords)
-                    return all(op_board.ships[i].hits), True
-
-        board.my_misses.append(coords)
-        op_board.op_misses.append(coords)
+
+        if ship := op_board.receive_shot(coords):
+            board.my_hit_mask |= coord_bit(coords)
+            return ship.sunk, True
+
+        board.my_miss_mask |= coord_bit(coords)
         return False, False
 
     async def get_file(self, player: discord.Member, *, hide: bool = True) -> tuple[discord.Embed, discord.File, discord.Embed, discord.File]:
@@ -246,14 +325,15 @@ class BattleShip:
         board2 = self.get_board(player, other=True)
         image2 = await board2.to_image(hide=hide)
 
-        file1 = discord.File(image1, 'board1.png')
-        file2 = discord.File(image2, 'board2.png')
+        name1, name2 = filename('board1'), filename('board2')
+        file1 = discord.File(image1, name1)
+        file2 = discord.File(image2, name2)
 
         embed1 = discord.Embed(color=self.embed_color)
         embed2 = discord.Embed(color=self.embed_color)
 
-        embed1.set_image(url='attachment://board1.png')
-        embed2.set_image(url='attachment://board2.png')
+        embed1.set_image(url=f'attachment://{name1}')
+        embed2.set_image(url=f'attachment://{name2}')
 
         return embed1, file1, embed2, file2
 
@@ -314,7 +394,7 @@ class BattleShip:
             )
 
             if board._is_valid(new_ship):
-                board.ships.append(new_ship)
+                board.add_ship(new_ship)
             else:
                 await user.send('That is a not a valid location, please try again')
                 await place_ship(ship, size, color)
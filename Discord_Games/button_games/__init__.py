@@ -5,7 +5,7 @@ they utilize UI components such as buttons.
 
 from .aki_buttons import BetaAkinator
 from .twenty_48_buttons import BetaTwenty48
-from .wordle_buttons import BetaWordle
+from .wordle_buttons import BetaWordle, BetaMultiWordle
 from .tictactoe_buttons import BetaTictactoe
 from .memory_game import MemoryGame
 from .rps_buttons import BetaRockPaperScissors
@@ -21,6 +21,7 @@ __all__ = (
     'BetaAkinator',
     'BetaTwenty48',
     'BetaWordle',
+    'BetaMultiWordle',
     'BetaTictactoe',
     'MemoryGame',
     'BetaRockPaperScissors',
@@ -221,7 +221,7 @@ class SetupInput(discord.ui.Modal):
 
         if board._is_valid(new_ship):
             self.button.disabled = True
-            board.ships.append(new_ship)
+            board.add_ship(new_ship)
 
             embed, file, _, _ = await game.get_file(interaction.user, hide=False) 
 
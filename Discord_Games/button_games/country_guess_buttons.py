@@ -6,6 +6,7 @@ import discord
 from discord.ext import commands
 
 from ..country_guess import CountryGuesser
+from ..encoding import get_profile
 from ..utils import DiscordColor, DEFAULT_COLOR
 
 class CountryInput(discord.ui.Modal, title='Input your guess!'):
@@ -27,13 +28,15 @@ class CountryInput(discord.ui.Modal, title='Input your guess!'):
         guess = self.guess.value.strip().lower()
         game = self.view.game
 
-        if guess == game.country:
+        if game.is_correct(guess):
+            game.score += 1
             game.update_guesslog('+ GAME OVER, you won! +')
             await interaction.response.send_message(f'That is correct! The country was `{game.country.title()}`')
 
             self.view.disable_all()
             game.embed.description = f'```fix\n{game.country.title()}\n```'
-            return await interaction.message.edit(view=self.view, embed=game.embed)
+            await interaction.message.edit(view=self.view, embed=game.embed)
+            return await game.next_round(interaction)
         else:
             game.guesses -= 1
 
@@ -42,12 +45,14 @@ class CountryInput(discord.ui.Modal, title='Input your guess!'):
                 game.update_guesslog('- GAME OVER, you lost -')
 
                 await interaction.message.edit(embed=game.embed, view=self.view)
-                return await interaction.response.send_message(f'Game Over! you lost, The country was `{game.country.title()}`')
+                await interaction.response.send_message(f'Game Over! you lost, The country was `{game.country.title()}`')
+                return await game.next_round(interaction)
             else:
                 acc = game.get_accuracy(guess)
                 game.update_guesslog(
                     f'- [{guess}] was incorrect! but you are ({acc}%) of the way there!\n'
-                    f'+ You have {game.guesses} guesses left.\n'
+                    + game.format_suggestions(guess, guess_log=True)
+                    + f'+ You have {game.guesses} guesses left.\n'
                 )
 
                 return await interaction.response.edit_message(embed=game.embed)
@@ -70,12 +75,20 @@ class CountryView(discord.ui.View):
 
     @discord.ui.button(label='hint', style=discord.ButtonStyle.green)
     async def hint_button(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        hint = self.game.get_hint()
         self.game.hints -= 1
-        await interaction.response.send_message(f'Here is your hint: `{hint}`', ephemeral=True)
 
         if not self.game.hints:
             button.disabled = True
+
+        if self.game.reveal:
+            # swaps the image of the game for the next reveal level
+            file = await self.game.get_reveal()
+            return await interaction.response.edit_message(embed=self.game.embed, attachments=[file], view=self)
+
+        hint = self.game.get_hint()
+        await interaction.response.send_message(f'Here is your hint: `{hint}`', ephemeral=True)
+
+        if not self.game.hints:
             await interaction.message.edit(view=self)
             
     @discord.ui.button(label='Cancel', style=discord.ButtonStyle.red)
@@ -85,7 +98,12 @@ class CountryView(discord.ui.View):
         self.game.embed.description = f'```fix\n{self.game.country.title()}\n```'
         self.game.update_guesslog('- GAME OVER, CANCELLED -')
 
-        await interaction.response.send_message(f'Game Over! The country was `{self.game.country.title()}`')
+        message = f'Game Over! The country was `{self.game.country.title()}`'
+        if self.game.rounds > 1:
+            self.game._next = None
+            message += f'\nSession over! Your final score is **{self.game.score}/{self.game.rounds}**'
+
+        await interaction.response.send_message(message)
         return await interaction.message.edit(view=self, embed=self.game.embed)
 
 class BetaCountryGuesser(CountryGuesser):
@@ -95,6 +113,56 @@ class BetaCountryGuesser(CountryGuesser):
         self.guesslog += log + '\n'
         self.embed.set_field_at(0, name='Guess Log', value=f'```diff\n{self.guesslog}\n```')
 
+    def get_embed(self) -> discord.Embed:
+        title = 'Guess that country!'
+        if self.rounds > 1:
+            title += f' (round {self.round}/{self.rounds})'
+
+        embed = discord.Embed(
+            title=title,
+            description=f'```fix\n{self.get_blanks()}\n```',
+            color=self.embed_color,
+        )
+        embed.add_field(name='Guess Log', value='```diff\n\u200b\n```', inline=False)
+        embed.set_image(url=f'attachment://{self.filename}')
+
+        if self.rounds > 1:
+            embed.set_footer(text=f'Score: {self.score}/{self.round - 1}')
+        return embed
+
+    def prefetch_next(self) -> None:
+        # the next round's country is picked and its image read in the background while this one is played,
+        # so advancing only has to upload it
+        if self.round < self.rounds:
+            self._next = self.pick_country(get_profile(), exclude=self._played)
+        else:
+            self._next = None
+
+    async def next_round(self, interaction: discord.Interaction) -> Optional[discord.Message]:
+        """
+        Starts the next round of a multi-round session, or sends the final score after the last one.
+        """
+        if self.rounds <= 1:
+            return
+
+        if self._next is None:
+            return await interaction.followup.send(f'Session over! Your final score is **{self.score}/{self.rounds}**')
+
+        catalog, country, image = await self._next
+        self.set_country(catalog, country, get_profile())
+        self._played.add(country.name)
+
+        self.round += 1
+        self.guesses, self.hints = self._initial
+        self.guesslog = ''
+        self.accepted_length = len(self.country) if self.ignore_diff_len else None
+
+        self.prefetch_next()
+
+        self.embed = self.get_embed()
+        view = CountryView(self, timeout=self.timeout)
+        return await interaction.followup.send(embed=self.embed, file=discord.File(image, self.filename), view=view)
+
     async def start(
         self, 
         ctx: commands.Context, 
@@ -102,19 +170,25 @@ class BetaCountryGuesser(CountryGuesser):
         embed_color: DiscordColor = DEFAULT_COLOR,
         ignore_diff_len: bool = False,
         timeout: Optional[float] = None,
+        rounds: int = 1,
     ) -> discord.Message:
 
-        self.accepted_length = len(self.country) if ignore_diff_len else None
+        self.embed_color = embed_color
+        self.ignore_diff_len = ignore_diff_len
+        self.timeout = timeout
+
+        self.rounds = rounds
+        self.round = 1
+        self.score = 0
+        self._initial = (self.guesses, self.hints)
 
         file = await self.get_country()
+        self._played: set[str] = {self.country_info.name}
 
-        self.embed = discord.Embed(
-            title='Guess that country!',
-            description=f'```fix\n{self.get_blanks()}\n```',
-            color=embed_color,
-        )
-        self.embed.add_field(name='Guess Log', value='```diff\n\u200b\n```', inline=False)
-        self.embed.set_image(url='attachment://country.png')
+        self.accepted_length = len(self.country) if ignore_diff_len else None
+        self.prefetch_next()
+
+        self.embed = self.get_embed()
 
         view = CountryView(self, timeout=timeout)
-        return await ctx.send(embed=self.embed, file=file, view=view)
\ No newline at end of file
+        return await ctx.send(embed=self.embed, file=file, view=view)
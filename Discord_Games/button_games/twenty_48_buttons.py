@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from typing import Optional
-import random
+import asyncio
 
 import discord
 from discord.ext import commands
 
-from ..twenty_48 import Twenty48
+from ..twenty_48 import Twenty48, DIRECTIONS
+from ..twenty_48_ai import Expectimax
+from ..utils import executor
 
 class Twenty48_Button(discord.ui.Button):
 
@@ -14,7 +16,12 @@ class Twenty48_Button(discord.ui.Button):
     
     def __init__(self, game: BetaTwenty48, emoji: str) -> None:
 
-        style = discord.ButtonStyle.red if emoji == '⏹️' else discord.ButtonStyle.blurple
+        if emoji == '⏹️':
+            style = discord.ButtonStyle.red
+        elif emoji in ('💡', '🤖', '↩️'):
+            style = discord.ButtonStyle.green
+        else:
+            style = discord.ButtonStyle.blurple
 
         self.game = game
         super().__init__(
@@ -33,32 +40,129 @@ class Twenty48_Button(discord.ui.Button):
         emoji = str(self.emoji)
 
         if emoji == '⏹️':
+            self.view.stop()
             return await interaction.message.delete()
 
-        elif emoji == '➡️':
-            self.game.move_right()
+        elif emoji == '💡':
+            # the search can wait behind renders in the executor, which can exceed the interaction window
+            await interaction.response.defer(ephemeral=True, thinking=True)
 
-        elif emoji == '⬅️':
-            self.game.move_left()
+            direction = await self.game.get_hint()
+            if direction is None:
+                return await interaction.followup.send('There are no moves left!', ephemeral=True)
+            return await interaction.followup.send(f'Try moving {direction}', ephemeral=True)
 
-        elif emoji == '⬇️':
-            self.game.move_down()
+        # moves, undos and autoplay frames are serialized, they all mutate the board and the shared canvas
+        async with self.game._lock:
+            if emoji == '🤖':
+                if self.game.autoplaying:
+                    self.game.stop_autoplay()
+                else:
+                    self.game.start_autoplay()
+                self.game.update_buttons()
+                return await interaction.response.edit_message(view=self.view)
 
-        elif emoji == '⬆️':
-            self.game.move_up()
+            if self.game.autoplaying:
+                # pressed before the message with the disabled buttons arrived
+                return await interaction.response.defer()
 
-        self.game.spawn_new()
+            if emoji == '↩️':
+                changed = self.game.undo()
+            else:
+                changed, _ = self.game.play(emoji)
 
-        if self.game._render_image:
-            image = await self.game.render_image()
-            return await interaction.response.edit_message(attachments=[image])
-        else:
-            board_string = self.game.number_to_emoji()
-            return await interaction.response.edit_message(content=board_string)
+            if not changed:
+                return await interaction.response.defer()
+
+            self.game.update_buttons()
+
+            if self.game._render_image:
+                image = await self.game.render_image()
+                return await interaction.response.edit_message(content=self.game.get_content(), attachments=[image], view=self.view)
+            else:
+                return await interaction.response.edit_message(content=self.game.get_content(), view=self.view)
+
+class Twenty48View(discord.ui.View):
+
+    def __init__(self, game: BetaTwenty48, *, timeout: Optional[float]) -> None:
+        super().__init__(timeout=timeout)
+
+        self.game = game
 
+    def stop(self) -> None:
+        self.game.stop_autoplay()
+        return super().stop()
+
+    async def on_timeout(self) -> None:
+        self.game.stop_autoplay()
 
 class BetaTwenty48(Twenty48):
-    view: discord.ui.View
+    view: Twenty48View
+    _lock: asyncio.Lock
+    _autoplay_task: Optional[asyncio.Task] = None
+
+    @executor()
+    def get_hint(self, *, depth: int = 3, time_budget: float = 1.0) -> Optional[str]:
+        return Expectimax(max_depth=depth, time_budget=time_budget).best_move(self._board)
+
+    @property
+    def autoplaying(self) -> bool:
+        return self._autoplay_task is not None and not self._autoplay_task.done()
+
+    def start_autoplay(self, *, delay: float = 1.0, time_budget: float = 0.5) -> None:
+        if not self.autoplaying:
+            self._autoplay_task = asyncio.create_task(self._autoplay(delay=delay, time_budget=time_budget))
+
+    def stop_autoplay(self) -> None:
+        task, self._autoplay_task = self._autoplay_task, None
+        if task is not None and not task.done():
+            task.cancel()
+
+    async def _autoplay(self, *, delay: float, time_budget: float) -> None:
+        # a frame is shielded, so that stopping never abandons a render running in the executor while the lock is released
+        while await asyncio.shield(self._autoplay_step(time_budget=time_budget)):
+            await asyncio.sleep(delay)
+
+    async def _autoplay_step(self, *, time_budget: float) -> bool:
+        async with self._lock:
+            direction = await self.get_hint(time_budget=time_budget)
+            if direction is None:
+                return False
+
+            self.play(direction)
+            self.update_buttons()
+
+            try:
+                if self._render_image:
+                    image = await self.render_image()
+                    await self.message.edit(content=self.get_content(), attachments=[image], view=self.view)
+                else:
+                    await self.message.edit(content=self.get_content(), view=self.view)
+            except discord.NotFound:
+                self.view.stop()
+                return False
+            except discord.HTTPException:
+                # a failed frame is caught up by the next one
+                pass
+            return True
+
+    def update_buttons(self) -> None:
+        legal = self.legal_moves()
+        autoplaying = self.autoplaying
+
+        for button in self.view.children:
+            if isinstance(button, Twenty48_Button):
+                emoji = str(button.emoji)
+
+                if emoji in DIRECTIONS:
+                    button.disabled = autoplaying or not legal & (1 << DIRECTIONS.index(emoji))
+                elif emoji == '↩️':
+                    button.disabled = autoplaying or not legal or not self.history.can_undo
+                elif emoji != '⏹️':
+                    button.disabled = not legal
+
+        if not legal:
+            self.view.stop()
 
     async def start(
         self, 
@@ -66,21 +170,37 @@ class BetaTwenty48(Twenty48):
         *,
         timeout: Optional[float] = None, 
         delete_button: bool = False,
+        hint_button: bool = False,
+        autoplay_button: bool = False,
+        undo_button: bool = False,
         **kwargs,
     ) -> None:
         
         self.player = ctx.author
-        self.view = discord.ui.View(timeout=timeout)
+        self.view = Twenty48View(self, timeout=timeout)
+        self._lock = asyncio.Lock()
+
+        self.spawn_new()
+        self.spawn_new()
+        self.history.start = self._board
+
+        if undo_button:
+            self._controls.append("↩️")
 
-        self.board[random.randrange(4)][random.randrange(4)] = 2
-        self.board[random.randrange(4)][random.randrange(4)] = 2
+        if hint_button:
+            self._controls.append("💡")
+
+        if autoplay_button:
+            self._controls.append("🤖")
 
         if delete_button:
             self._controls.append("⏹️")
 
         for button in self._controls:
             self.view.add_item(Twenty48_Button(self, button))
-        
+
+        self.update_buttons()
+
         if self._render_image:
             image = await self.render_image()
             self.message = await ctx.send(file=image, view=self.view, **kwargs)
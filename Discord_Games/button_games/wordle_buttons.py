@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 from typing import Optional
+from io import BytesIO
 
 import discord
 from discord.ext import commands
 
-from ..wordle import Wordle
+from ..wordle import Wordle, render_multi
+from ..wordle_engine import encode, score, SOLVED
+from ..utils import DiscordColor, DEFAULT_COLOR, executor
+from ..encoding import filename
 
 class WordInput(discord.ui.Modal, title='Word Input'):
     word = discord.ui.TextInput(
@@ -31,18 +35,19 @@ class WordInput(discord.ui.Modal, title='Word Input'):
 
         if content not in game._valid_words:
             return await interaction.response.send_message('That is not a valid word!', ephemeral=True)
+        elif not game.is_allowed(content):
+            return await interaction.response.send_message('Hard mode is on! Your guess must use every hint revealed so far.', ephemeral=True)
         else:
             won = game.parse_guess(content)
             buf = await game.render_image()
 
-            embed = discord.Embed(title='Wordle!', color=self.view.game.color)
-            embed.set_image(url='attachment://wordle.png')
-            file = discord.File(buf, 'wordle.png')
+            embed = game.get_embed()
+            file = discord.File(buf, filename('wordle'))
 
             if won:
                 self.disable_all()
                 await interaction.message.reply('Game Over! You won!', mention_author=True)
-            elif len(game.guesses) >= 6:
+            elif len(game.guesses) >= game.max_guesses:
                 self.disable_all()
                 await interaction.message.reply(f'Game Over! You lose, the word was: **{game.word}**', mention_author=True)
             
@@ -68,27 +73,134 @@ class WordInputButton(discord.ui.Button):
             else:
                 return await interaction.response.send_modal(WordInput(self.view))
 
+class WordleSolverButton(discord.ui.Button):
+    view: WordleView
+
+    def __init__(self, *, remaining_button: bool = False):
+        super().__init__(
+            label='Remaining words' if remaining_button else 'Hint',
+            style=discord.ButtonStyle.green,
+        )
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        game = self.view.game
+        if interaction.user != game.player:
+            return await interaction.response.send_message("This isn't your game!", ephemeral=True)
+
+        # the pattern matrix may need to be built first, which can exceed the interaction window
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        if self.label == 'Hint':
+            word, bits = await game.get_hint()
+            await interaction.followup.send(f'Try guessing **{word}** (`{bits:.2f}` bits of information)', ephemeral=True)
+        else:
+            count, words = game.get_remaining()
+            shown = ', '.join(words)
+            if count > len(words):
+                shown += f', ... (+{count - len(words)} more)'
+            await interaction.followup.send(f'**{count}** possible words remaining:\n`{shown}`', ephemeral=True)
+
 class WordleView(discord.ui.View):
     
-    def __init__(self, game: BetaWordle, *, timeout: float):
+    def __init__(self, game: BetaWordle, *, timeout: float, hints: bool = False):
         super().__init__(timeout=timeout)
 
         self.game = game
         self.add_item(WordInputButton())
         self.add_item(WordInputButton(cancel_button=True))
+
+        if hints:
+            self.add_item(WordleSolverButton())
+            self.add_item(WordleSolverButton(remaining_button=True))
     
 class BetaWordle(Wordle):
     player: discord.Member
 
-    async def start(self, ctx: commands.Context, *, timeout: Optional[float] = None) -> discord.Message:
+    async def start(
+        self, 
+        ctx: commands.Context, 
+        *, 
+        timeout: Optional[float] = None, 
+        embed_color: DiscordColor = DEFAULT_COLOR,
+        hints: bool = False,
+    ) -> discord.Message:
         self.player = ctx.author
+        self.embed_color = embed_color
 
         buf = await self.render_image()
-        embed = discord.Embed(title='Wordle!', color=self.color)
-        embed.set_image(url='attachment://wordle.png')
 
         return await ctx.send(
-            embed=embed,
-            file=discord.File(buf, 'wordle.png'), 
-            view=WordleView(self, timeout=timeout)
-        )
\ No newline at end of file
+            embed=self.get_embed(),
+            file=discord.File(buf, filename('wordle')), 
+            view=WordleView(self, timeout=timeout, hints=hints)
+        )
+
+class BetaMultiWordle(BetaWordle):
+    """
+    Quordle / Octordle style Wordle, every guess is played on `boards` hidden words at once.
+    """
+
+    def __init__(self, boards: int = 4) -> None:
+        super().__init__()
+
+        self.boards = boards
+        self.max_guesses = boards + 5
+        self.columns = 2 if boards <= 4 else 4
+
+        words: list[str] = []
+        while len(words) < boards:
+            if (word := self._valid_words.random()) not in words:
+                words.append(word)
+
+        self.words = words
+        self.word = ', '.join(words)
+        self._answers = encode(words)
+
+        # the guess index each board was solved on
+        self.solved_on: list[Optional[int]] = [None] * boards
+        self.guesses: list[tuple[str, tuple[int, ...]]] = []
+
+        self._board_candidates: list[int] = [self._index.full] * boards
+
+    def parse_guess(self, guess: str) -> bool:
+        patterns = tuple(int(pattern) for pattern in score(guess, self._answers))
+        self.guesses.append((guess, patterns))
+
+        for k, pattern in enumerate(patterns):
+            if self.solved_on[k] is not None:
+                continue
+
+            self._board_candidates[k] &= self._index.consistent(guess, pattern)
+            if pattern == SOLVED:
+                self.solved_on[k] = len(self.guesses) - 1
+
+        return all(solved is not None for solved in self.solved_on)
+
+    def get_embed(self) -> discord.Embed:
+        embed = discord.Embed(title='Wordle!', color=self.embed_color)
+        embed.set_image(url=f'attachment://{filename("wordle")}')
+
+        if self.guesses:
+            remaining = [
+                '✅' if solved is not None else str(self._index.count(candidates))
+                for solved, candidates in zip(self.solved_on, self._board_candidates)
+            ]
+            embed.set_footer(text=f'Possible words per board: {" | ".join(remaining)}')
+        return embed
+
+    @executor()
+    def render_image(self) -> BytesIO:
+        boards = []
+        for k, solved in enumerate(self.solved_on):
+            played = self.guesses if solved is None else self.guesses[:solved + 1]
+            boards.append([(guess, patterns[k]) for guess, patterns in played])
+        return render_multi(boards, rows=self.max_guesses, columns=self.columns)
+
+    async def start(
+        self, 
+        ctx: commands.Context, 
+        *, 
+        timeout: Optional[float] = None, 
+        embed_color: DiscordColor = DEFAULT_COLOR,
+    ) -> discord.Message:
+        return await super().start(ctx, timeout=timeout, embed_color=embed_color)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import NamedTuple, Optional, Union
+from io import BytesIO
+import pathlib
+import random
+import threading
+
+from .utils import ASSETS_DIR
+from .country_pack import CountryPack, SourcePack, get_pack
+from .similarity import TrigramIndex
+from .encoding import get_profile
+
+__all__ = (
+    'Country',
+    'CountryCatalog',
+    'get_catalog',
+)
+
+# tab separated: name, region, difficulty (1 - 3), `;` separated aliases
+METADATA_PATH = ASSETS_DIR / 'countries.tsv'
+
+DEFAULT_REGION = 'Unknown'
+DEFAULT_DIFFICULTY = 2
+
+_catalogs: dict[tuple[str, str], CountryCatalog] = {}
+_lock = threading.Lock()
+
+class Country(NamedTuple):
+    name: str
+    answer: str
+    aliases: tuple[str, ...]
+    region: str
+    difficulty: int
+
+    @property
+    def answers(self) -> tuple[str, ...]:
+        return (self.answer,) + self.aliases
+
+    def accepts(self, guess: str) -> bool:
+        return guess == self.answer or guess in self.aliases
+
+def _load_metadata(path: pathlib.Path) -> dict[str, tuple[str, int, tuple[str, ...]]]:
+    # maps every casefolded name and alias to (region, difficulty, names of the group)
+    metadata = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            name, region, difficulty, aliases = line.rstrip('\n').split('\t')
+            names = (name.casefold(),) + tuple(alias.casefold() for alias in aliases.split(';') if alias)
+            for key in names:
+                metadata[key] = (region, int(difficulty), names)
+    return metadata
+
+class CountryCatalog:
+    """
+    Every country of an asset pack with its accepted answers, region and difficulty,
+    bucketed by every (region, difficulty) filter combination so that a filtered random pick is a single `random.choice`.
+    """
+
+    def __init__(self, pack: Union[CountryPack, SourcePack], metadata_path: pathlib.Path = METADATA_PATH) -> None:
+        self.pack = pack
+        metadata = _load_metadata(metadata_path)
+
+        self.countries: list[Country] = []
+        for name in pack.names:
+            answer = name.strip().casefold()
+            region, difficulty, names = metadata.get(answer, (DEFAULT_REGION, DEFAULT_DIFFICULTY, (answer,)))
+            self.countries.append(Country(
+                name=name,
+                answer=answer,
+                aliases=tuple(alias for alias in names if alias != answer),
+                region=region,
+                difficulty=difficulty,
+            ))
+
+        self.names: list[str] = [country.name for country in self.countries]
+
+        self._answers: dict[str, Country] = {}
+        for country in self.countries:
+            for answer in country.answers:
+                self._answers.setdefault(answer, country)
+        self.index: TrigramIndex[Country] = TrigramIndex(self._answers.items())
+
+        self.regions: tuple[str, ...] = tuple(sorted({country.region for country in self.countries}))
+        self.difficulties: tuple[int, ...] = tuple(sorted({country.difficulty for country in self.countries}))
+
+        # the key `None` stands for "any"
+        self._buckets: dict[tuple[Optional[str], Optional[int]], list[Country]] = {}
+        for country in self.countries:
+            region = country.region.casefold()
+            for key in ((None, None), (region, None), (None, country.difficulty), (region, country.difficulty)):
+                self._buckets.setdefault(key, []).append(country)
+
+    def __len__(self) -> int:
+        return len(self.countries)
+
+    def lookup(self, answer: str) -> Optional[Country]:
+        return self._answers.get(answer.strip().casefold())
+
+    def suggest(self, guess: str, *, limit: int = 3, max_distance: Optional[int] = None) -> list[Country]:
+        """
+        The countries with a name or alias nearest to `guess`.
+        """
+        return [country for _, country, _ in self.index.search(guess.strip().casefold(), limit=limit, max_distance=max_distance)]
+
+    def bucket(self, *, region: Optional[str] = None, difficulty: Optional[int] = None) -> list[Country]:
+        return self._buckets.get((region.casefold() if region else None, difficulty), [])
+
+    def random(self, *, region: Optional[str] = None, difficulty: Optional[int] = None) -> Country:
+        bucket = self.bucket(region=region, difficulty=difficulty)
+        if not bucket:
+            raise LookupError(f'No countries with region={region!r} and difficulty={difficulty!r}')
+        return random.choice(bucket)
+
+    def open(self, country: Country, variant: str = 'normal') -> BytesIO:
+        return self.pack.open(country.name, variant)
+
+def get_catalog(kind: str = 'data', profile: Optional[str] = None) -> CountryCatalog:
+    """
+    Returns the process-wide catalog for `kind` ('data' or 'flags') and encoding profile, see `get_pack`.
+    """
+    key = (kind, get_profile(profile).name)
+    pack = get_pack(*key)
+
+    if (catalog := _catalogs.get(key)) is None:
+        with _lock:
+            if key not in _catalogs:
+                _catalogs[key] = CountryCatalog(pack)
+            catalog = _catalogs[key]
+
+    # swaps in the built pack once a background build is done
+    catalog.pack = pack
+    return catalog
@@ -1,22 +1,25 @@
 from __future__ import annotations
 
-from typing import Union, Optional
+from typing import Container, Union, Optional
 from io import BytesIO
-import os
-import pathlib
 import random
-import difflib
 
 import discord
 from discord.ext import commands
-from PIL import Image, ImageFilter, ImageOps
+from PIL import Image
 
 from .utils import *
+from .country_pack import REVEAL_LEVELS, variant_name, blur, invert
+from .country_catalog import Country, CountryCatalog, get_catalog
+from .similarity import Matcher
+from .encoding import EncodeProfile, get_profile, filename
 
 class CountryGuesser:
     embed: discord.Embed
     accepted_length: Optional[int]
     country: str
+    country_info: Country
+    filename: str
 
     def __init__(
         self, 
@@ -25,10 +28,19 @@ class CountryGuesser:
         light_mode: bool = False,
         hard_mode: bool = False,
         guesses: int = 5, 
-        hints: int = 1
+        hints: int = 1,
+        region: Optional[str] = None,
+        difficulty: Optional[int] = None,
+        max_typos: int = 0,
+        reveal: bool = False,
     ) -> None:
 
-        self.hints = hints
+        # in reveal mode the image starts out pixelated and every hint shows a clearer level instead of letters,
+        # `hints` only counts letter hints, a reveal game always has one hint per step up to the final image
+        self.reveal = reveal
+        self.reveal_level = 0
+
+        self.hints = len(REVEAL_LEVELS) if reveal else hints
         self.guesses = guesses
 
         self.is_flags = is_flags
@@ -39,20 +51,64 @@ class CountryGuesser:
         else:
             self.light_mode: bool = light_mode
 
-        folder = r'\country-flags' if self.is_flags else r'\country-data'
-        self._countries_path = fr'{pathlib.Path(__file__).parent}\assets{folder}'
+        # restricts the random pick to a region and / or difficulty (1 - 3) of the catalog
+        self.region = region
+        self.difficulty = difficulty
+        # guesses within this many edits of the answer or one of its aliases count as correct
+        self.max_typos = max_typos
+
+        self._pack_kind = 'flags' if self.is_flags else 'data'
 
-        self.all_countries = os.listdir(self._countries_path)
+    @executor()
+    def pick_country(self, profile: EncodeProfile, *, exclude: Container[str] = ()) -> tuple[CountryCatalog, Country, BytesIO]:
+        """
+        Picks a random country and reads its image, without changing the state of the game,
+        only the first game of a process loads the catalog, and starts building the asset pack if it is not in the cache yet.
+        """
+        catalog = get_catalog(self._pack_kind, profile.name)
+
+        # a few retries are enough to skip countries played earlier in a session
+        for _ in range(5):
+            country = catalog.random(region=self.region, difficulty=self.difficulty)
+            if country.name not in exclude:
+                break
+
+        # every variant is pre-rendered in a built pack, so this is a copy out of the mapped file
+        return catalog, country, catalog.open(country, self.get_variant(0 if self.reveal else None))
+
+    def get_variant(self, reveal: Optional[int] = None) -> str:
+        # past the last reveal level the image is shown as it would be without reveal mode
+        if reveal is not None and reveal >= len(REVEAL_LEVELS):
+            reveal = None
+        return variant_name(blurred=self.hard_mode, inverted=self.light_mode, reveal=reveal)
+
+    @executor()
+    def _read_image(self, variant: str) -> BytesIO:
+        return self.catalog.open(self.country_info, variant)
+
+    async def get_reveal(self) -> discord.File:
+        """
+        The image of the next reveal level.
+        """
+        self.reveal_level += 1
+        image = await self._read_image(self.get_variant(self.reveal_level))
+        return discord.File(image, self.filename)
+
+    def set_country(self, catalog: CountryCatalog, country: Country, profile: EncodeProfile) -> None:
+        self.all_countries = catalog.names
+        self.catalog = catalog
+
+        self.country_info = country
+        self.country = country.answer
+        self._matchers = [Matcher(answer) for answer in country.answers]
+        self.reveal_level = 0
+
+        self.filename = filename('country', profile)
 
     @executor()
     def invert_image(self, image_path: Union[BytesIO, str]) -> BytesIO:
         with Image.open(image_path) as img:
-            img = img.convert('RGBA')
-            r, g, b, a = img.split()
-            rgb = Image.merge('RGB', (r, g, b))
-            rgb = ImageOps.invert(rgb)
-            rgb = rgb.split()
-            img = Image.merge('RGBA', rgb + (a,))
+            img = invert(img)
 
             buf = BytesIO()
             img.save(buf, 'PNG')
@@ -62,8 +118,7 @@ class CountryGuesser:
     @executor()
     def blur_image(self, image_path: Union[BytesIO, str]) -> BytesIO:
         with Image.open(image_path) as img:
-            img = img.convert('RGBA')
-            img = img.filter(ImageFilter.GaussianBlur(10))
+            img = blur(img)
 
             buf = BytesIO()
             img.save(buf, 'PNG')
@@ -71,18 +126,10 @@ class CountryGuesser:
             return buf
 
     async def get_country(self) -> discord.File:
-        country_file = random.choice(self.all_countries)
-        self.country = country_file.strip().removesuffix('.png').lower()
-
-        file = os.path.join(self._countries_path, country_file)
-
-        if self.hard_mode:
-            file = await self.blur_image(file)
-        
-        if self.light_mode:
-            file = await self.invert_image(file)
-
-        return discord.File(file, 'country.png')
+        profile = get_profile()
+        catalog, country, image = await self.pick_country(profile)
+        self.set_country(catalog, country, profile)
+        return discord.File(image, self.filename)
 
     def get_blanks(self) -> str:
         return ' '.join('_' if char != ' ' else ' ' for char in self.country)
@@ -96,8 +143,46 @@ class CountryGuesser:
             blanks[idx] = self.country[idx]
         return ' '.join(blanks)
 
+    def is_correct(self, guess: str) -> bool:
+        if self.country_info.accepts(guess):
+            return True
+        if not self.max_typos:
+            return False
+
+        # typos only forgive misspellings, never the exact name of another country
+        other = self.catalog.lookup(guess)
+        if other is not None and other != self.country_info:
+            return False
+
+        # answers this short are within `max_typos` of too many unrelated guesses
+        return any(
+            matcher.distance(guess, self.max_typos) is not None
+            for answer, matcher in zip(self.country_info.answers, self._matchers)
+            if len(answer) > 2 * self.max_typos
+        )
+
     def get_accuracy(self, guess: str) -> int:
-        return round(difflib.SequenceMatcher(None, guess, self.country).ratio() * 100)
+        return round(self._matchers[0].ratio(guess) * 100)
+
+    def get_suggestions(self, guess: str, *, limit: int = 3) -> list[str]:
+        """
+        Nearest country names to a guess that is not a country name itself, to point out typos.
+        """
+        if self.catalog.lookup(guess) is not None:
+            return []
+        max_distance = max(2, len(guess) // 3)
+        return [country.answer.title() for country in self.catalog.suggest(guess, limit=limit, max_distance=max_distance)]
+
+    def format_suggestions(self, guess: str, *, guess_log: bool = False) -> str:
+        """
+        The "Did you mean" line for a guess, as a chat reply suffix or, with `guess_log`, as a line of the diff styled guess log.
+        """
+        suggestions = self.get_suggestions(guess)
+        if not suggestions:
+            return ''
+        if guess_log:
+            return f'+ Did you mean: {", ".join(suggestions)}?\n'
+        return '\nDid you mean: ' + ', '.join(f'`{name}`' for name in suggestions) + '?'
 
     async def wait_for_response(
         self, 
@@ -138,7 +223,7 @@ class CountryGuesser:
             color=embed_color,
         )
         self.embed.set_footer(text='send your guess into the chat now!')
-        self.embed.set_image(url='attachment://country.png')
+        self.embed.set_image(url=f'attachment://{self.filename}')
         await ctx.send(embed=self.embed, file=file)
 
         self.accepted_length = len(self.country) if ignore_diff_len else None
@@ -147,7 +232,7 @@ class CountryGuesser:
 
             msg, response = await self.wait_for_response(ctx, length=self.accepted_length)
 
-            if response == self.country:
+            if self.is_correct(response):
                 return await msg.reply(f'That is correct! The country was `{self.country.title()}`')
             else:
                 self.guesses -= 1
@@ -156,14 +241,19 @@ class CountryGuesser:
                     return await msg.reply(f'Game Over! you lost, The country was `{self.country.title()}`')
                 
                 acc = self.get_accuracy(response)
+                suggestions = self.format_suggestions(response)
 
                 if not self.hints:
-                    await msg.reply(f'That was incorrect! but you are `{acc}%` of the way there!\nYou have **{self.guesses}** guesses left.', mention_author=False)
+                    await msg.reply(f'That was incorrect! but you are `{acc}%` of the way there!{suggestions}\nYou have **{self.guesses}** guesses left.', mention_author=False)
                 else:
-                    await msg.reply(f'That is incorrect! but you are `{acc}%` of the way there!\nWould you like a hint? type: `(y/n)`', mention_author=False)
+                    await msg.reply(f'That is incorrect! but you are `{acc}%` of the way there!{suggestions}\nWould you like a hint? type: `(y/n)`', mention_author=False)
 
                     hint_msg, resp = await self.wait_for_response(ctx, options=('y', 'n'))
-                    if resp == 'y':
+                    if resp == 'y' and self.reveal:
+                        file = await self.get_reveal()
+                        self.hints -= 1
+                        await hint_msg.reply('Here is a clearer picture!', file=file, mention_author=False)
+                    elif resp == 'y':
                         hint = self.get_hint()
                         self.hints -= 1
                         await hint_msg.reply(f'Here is your hint: `{hint}`', mention_author=False)
@@ -0,0 +1,325 @@
+"""
+Builds and serves the CountryGuesser asset packs.
+
+Every country image is stored once per variant (normal, blurred, inverted, blurred and inverted,
+and a pyramid of pixelated reveal levels of each of those),
+already encoded with an `encoding` profile, in a single file that is memory-mapped and sliced by byte offset at game time.
+Packs should be built into the cache directory ahead of time with:
+
+    python -m Discord_Games.country_pack [data|flags] [--profile png|palette|webp]
+
+otherwise the first game builds them in a background thread, and a `SourcePack` renders single images meanwhile.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import argparse
+import functools
+import json
+import logging
+import mmap
+import os
+import pathlib
+import struct
+import threading
+
+from PIL import Image, ImageFilter, ImageOps
+
+from .utils import ASSETS_DIR, cache_path
+from .encoding import PROFILES, EncodeProfile, get_profile, encode
+
+__all__ = (
+    'CountryPack',
+    'SourcePack',
+    'get_pack',
+    'build_pack',
+    'variant_name',
+    'blur',
+    'invert',
+    'pixelate',
+    'REVEAL_LEVELS',
+)
+
+_log = logging.getLogger(__name__)
+
+PACK_VERSION = 4
+
+# file layout: header, the encoded images back to back, then the JSON index at `index_offset`
+MAGIC = b'DGCP'
+HEADER = struct.Struct('<4sHQI')
+
+FOLDERS = {
+    'data': ASSETS_DIR / 'country-data',
+    'flags': ASSETS_DIR / 'country-flags',
+}
+
+# the number of pixel blocks along the longest side of each reveal level, from the most to the least pixelated,
+# every level is pixelated from the image a game ends up showing, so that hard mode stays blurred throughout
+REVEAL_LEVELS = (12, 24, 48, 96)
+
+def _with_reveal(*bases: str) -> tuple[str, ...]:
+    return bases + tuple(f'{base}-reveal-{level}' for base in bases for level in range(len(REVEAL_LEVELS)))
+
+# flags are never played in light mode, so they do not need the inverted variants
+VARIANTS = {
+    'data': _with_reveal('normal', 'blurred', 'inverted', 'blurred-inverted'),
+    'flags': _with_reveal('normal', 'blurred'),
+}
+
+_packs: dict[tuple[str, str], CountryPack] = {}
+# stand-ins for the packs being built in the background
+_building: dict[tuple[str, str], SourcePack] = {}
+_lock = threading.Lock()
+
+def variant_name(*, blurred: bool = False, inverted: bool = False, reveal: Optional[int] = None) -> str:
+    if blurred and inverted:
+        name = 'blurred-inverted'
+    elif blurred:
+        name = 'blurred'
+    elif inverted:
+        name = 'inverted'
+    else:
+        name = 'normal'
+    return f'{name}-reveal-{reveal}' if reveal is not None else name
+
+def blur(img: Image.Image) -> Image.Image:
+    return img.convert('RGBA').filter(ImageFilter.GaussianBlur(10))
+
+def invert(img: Image.Image) -> Image.Image:
+    r, g, b, a = img.convert('RGBA').split()
+    rgb = ImageOps.invert(Image.merge('RGB', (r, g, b)))
+    return Image.merge('RGBA', rgb.split() + (a,))
+
+def pixelate(img: Image.Image, blocks: int) -> Image.Image:
+    img = img.convert('RGBA')
+    scale = max(img.size) / blocks
+    small = img.resize((max(round(img.width / scale), 1), max(round(img.height / scale), 1)), Image.BOX)
+    return small.resize(img.size, Image.NEAREST)
+
+def _render_variants(file: pathlib.Path, variants: tuple[str, ...], profile: EncodeProfile) -> list[bytes]:
+    with Image.open(file) as img:
+        img.load()
+        bases: dict[str, Image.Image] = {'normal': img}
+
+        def base(name: str) -> Image.Image:
+            if name not in bases:
+                if name == 'blurred':
+                    bases[name] = blur(img)
+                elif name == 'inverted':
+                    bases[name] = invert(img)
+                elif name == 'blurred-inverted':
+                    bases[name] = invert(base('blurred'))
+                else:
+                    raise ValueError(f'unknown variant {name!r}')
+            return bases[name]
+
+        blobs = []
+        for variant in variants:
+            name, _, level = variant.partition('-reveal-')
+            if level:
+                blobs.append(encode(pixelate(base(name), REVEAL_LEVELS[int(level)]), profile, record=False).getvalue())
+            elif name == 'normal' and profile.name == 'png':
+                # the source files already are full size PNGs
+                blobs.append(file.read_bytes())
+            else:
+                blobs.append(encode(base(name), profile, record=False).getvalue())
+        return blobs
+
+class CountryPack:
+    """
+    A read-only, memory-mapped asset pack, see `build_pack`.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, index_offset, index_length = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != PACK_VERSION:
+            raise ValueError(f'{path} is not a version {PACK_VERSION} country pack')
+
+        index = json.loads(self._mmap[index_offset:index_offset + index_length])
+        self.variants: tuple[str, ...] = tuple(index['variants'])
+        self.profile: EncodeProfile = get_profile(index['profile'])
+        self._entries: dict[str, list[list[int]]] = index['countries']
+        self.names: list[str] = list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def entry(self, name: str) -> list[list[int]]:
+        """
+        The (offset, length) of every variant of `name`, in the order of `variants`.
+        """
+        return self._entries[name]
+
+    def read(self, offset: int, length: int) -> bytes:
+        return self._mmap[offset:offset + length]
+
+    def get(self, name: str, variant: str = 'normal') -> bytes:
+        return self.read(*self._entries[name][self.variants.index(variant)])
+
+    def open(self, name: str, variant: str = 'normal') -> BytesIO:
+        return BytesIO(self.get(name, variant))
+
+@functools.lru_cache(maxsize=64)
+def _render_variant(file: pathlib.Path, variant: str, profile: str) -> bytes:
+    return _render_variants(file, (variant,), get_profile(profile))[0]
+
+class SourcePack:
+    """
+    Serves the images of a pack that is not built yet, rendering them one at a time from the source folder.
+    """
+
+    def __init__(self, kind: str, profile: EncodeProfile) -> None:
+        self.profile = profile
+        self.variants: tuple[str, ...] = VARIANTS[kind]
+        self._files = {file.stem: file for file in sorted(_source_files(kind))}
+        self.names: list[str] = list(self._files)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._files
+
+    def get(self, name: str, variant: str = 'normal') -> bytes:
+        if variant not in self.variants:
+            raise ValueError(f'unknown variant {variant!r}')
+        return _render_variant(self._files[name], variant, self.profile.name)
+
+    def open(self, name: str, variant: str = 'normal') -> BytesIO:
+        return BytesIO(self.get(name, variant))
+
+def build_pack(
+    path: pathlib.Path,
+    files: Iterable[pathlib.Path],
+    variants: tuple[str, ...],
+    profile: EncodeProfile,
+    *,
+    jobs: Optional[int] = None,
+) -> CountryPack:
+    files = sorted(files)
+    entries: dict[str, list[list[int]]] = {}
+
+    # rendering is spread over worker processes unless `jobs` is 1, as it is for builds triggered inside a bot
+    pool = ProcessPoolExecutor(jobs) if jobs != 1 else None
+    mapper = pool.map if pool else map
+
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, PACK_VERSION, 0, 0))
+
+            for file, blobs in zip(files, mapper(_render_variants, files, [variants] * len(files), [profile] * len(files))):
+                entries[file.stem] = []
+                for blob in blobs:
+                    entries[file.stem].append([f.tell(), len(blob)])
+                    f.write(blob)
+
+            index = json.dumps({'variants': variants, 'profile': profile.name, 'countries': entries}).encode()
+            index_offset = f.tell()
+            f.write(index)
+
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, PACK_VERSION, index_offset, len(index)))
+        os.replace(tmp, path)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    return CountryPack(path)
+
+def _source_files(kind: str) -> list[pathlib.Path]:
+    return [file for file in FOLDERS[kind].iterdir() if file.suffix == '.png']
+
+def _pack_path(kind: str, profile: EncodeProfile, files: list[pathlib.Path]) -> pathlib.Path:
+    # a changed asset folder produces a new file name, so stale packs are never served
+    stamp = max((file.stat().st_mtime_ns for file in files), default=0)
+    return cache_path(f'countries-{kind}-{profile.name}-v{PACK_VERSION}-{len(files)}-{stamp}.pack')
+
+def _build_in_background(key: tuple[str, str], path: pathlib.Path, files: list[pathlib.Path], profile: EncodeProfile, jobs: Optional[int]) -> None:
+    try:
+        pack = build_pack(path, files, VARIANTS[key[0]], profile, jobs=jobs)
+    except Exception:
+        _log.exception('Building the %s country pack (%s) failed, images keep being rendered on demand', *key)
+        return
+
+    with _lock:
+        _packs[key] = pack
+        del _building[key]
+    _log.info('Built the %s country pack (%s) at %s', *key, path)
+
+def get_pack(kind: str = 'data', profile: Optional[str] = None, *, jobs: Optional[int] = 1) -> Union[CountryPack, SourcePack]:
+    """
+    Returns the process-wide pack for `kind` ('data' or 'flags') encoded with `profile`, the active one by default.
+
+    A pack that is not in the cache yet is built in a background thread, with `jobs` worker processes,
+    and a `SourcePack` is returned until it is done, so that no game waits on the build.
+    """
+    profile = get_profile(profile)
+    key = (kind, profile.name)
+
+    if (pack := _packs.get(key)) is not None:
+        return pack
+
+    with _lock:
+        if key in _packs:
+            return _packs[key]
+        if key in _building:
+            return _building[key]
+
+        files = _source_files(kind)
+        path = _pack_path(kind, profile, files)
+        try:
+            pack = _packs[key] = CountryPack(path)
+            return pack
+        except (OSError, ValueError):
+            pass
+
+        _log.warning(
+            'The %s country pack (%s) is not built yet, building it in the background and rendering images on demand meanwhile. '
+            'Build it ahead of time with `python -m Discord_Games.country_pack %s --profile %s`',
+            kind, profile.name, kind, profile.name,
+        )
+        source = _building[key] = SourcePack(kind, profile)
+        threading.Thread(
+            target=_build_in_background,
+            args=(key, path, files, profile, jobs),
+            name=f'country-pack-{kind}-{profile.name}',
+            daemon=True,
+        ).start()
+        return source
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Build the CountryGuesser asset packs into the cache directory.')
+    parser.add_argument('kinds', nargs='*', metavar='{data,flags}', help='the packs to build, defaults to both')
+    parser.add_argument('-p', '--profile', choices=list(PROFILES), default=None, help='encoding profile, defaults to the active one')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes, defaults to the cpu count')
+    args = parser.parse_args(argv)
+
+    for kind in args.kinds:
+        if kind not in FOLDERS:
+            parser.error(f'unknown pack {kind!r}')
+    args.kinds = args.kinds or list(FOLDERS)
+
+    profile = get_profile(args.profile)
+    for kind in args.kinds:
+        files = _source_files(kind)
+        path = _pack_path(kind, profile, files)
+        try:
+            pack = CountryPack(path)
+        except (OSError, ValueError):
+            pack = build_pack(path, files, VARIANTS[kind], profile, jobs=args.jobs)
+        print(f'{kind} ({pack.profile.name}): {len(pack)} countries, {pack.path.stat().st_size / 1e6:.1f} MB -> {pack.path}')
+
+if __name__ == '__main__':
+    main()
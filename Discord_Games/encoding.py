@@ -0,0 +1,122 @@
+"""
+Shared image encoding for every game that uploads a picture.
+
+A profile decides the format, palette quantization and the largest side images are downscaled to,
+the active profile is process-wide, set with `set_profile` or the `DISCORD_GAMES_IMAGE_PROFILE` environment variable.
+"""
+
+from __future__ import annotations
+
+from typing import Any, NamedTuple, Optional, Union
+from io import BytesIO
+import os
+import threading
+import time
+
+from PIL import Image
+
+__all__ = (
+    'EncodeProfile',
+    'EncodeStats',
+    'PROFILES',
+    'get_profile',
+    'set_profile',
+    'encode',
+    'filename',
+    'get_metrics',
+)
+
+class EncodeProfile(NamedTuple):
+    name: str
+    format: str
+    extension: str
+    options: dict[str, Any]
+    # quantize to a 256 color palette before saving
+    palette: bool = False
+    # the longest side, larger images are downscaled, discord never displays embed images much larger than this
+    max_size: Optional[int] = None
+
+PROFILES: dict[str, EncodeProfile] = {
+    'png': EncodeProfile('png', 'PNG', 'png', {}),
+    'palette': EncodeProfile('palette', 'PNG', 'png', {'optimize': True}, palette=True, max_size=800),
+    'webp': EncodeProfile('webp', 'WEBP', 'webp', {'lossless': True, 'method': 4}, max_size=800),
+}
+
+class EncodeStats:
+    __slots__ = ('count', 'bytes', 'seconds')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def mean_bytes(self) -> float:
+        return self.bytes / self.count if self.count else 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.count if self.count else 0.0
+
+    def __repr__(self) -> str:
+        return f'<EncodeStats count={self.count} mean_bytes={self.mean_bytes:.0f} mean_seconds={self.mean_seconds:.4f}>'
+
+_profile: EncodeProfile = PROFILES[os.environ.get('DISCORD_GAMES_IMAGE_PROFILE', 'png')]
+
+_metrics: dict[str, EncodeStats] = {name: EncodeStats() for name in PROFILES}
+_lock = threading.Lock()
+
+ProfileLike = Union[EncodeProfile, str, None]
+
+def get_profile(profile: ProfileLike = None) -> EncodeProfile:
+    if profile is None:
+        return _profile
+    elif isinstance(profile, str):
+        return PROFILES[profile]
+    return profile
+
+def set_profile(profile: Union[EncodeProfile, str]) -> None:
+    global _profile
+    _profile = get_profile(profile)
+
+    with _lock:
+        _metrics.setdefault(_profile.name, EncodeStats())
+
+def filename(stem: str, profile: ProfileLike = None) -> str:
+    return f'{stem}.{get_profile(profile).extension}'
+
+def encode(image: Image.Image, profile: ProfileLike = None, *, record: bool = True) -> BytesIO:
+    """
+    Encodes `image` with `profile`, the active one by default,
+    `record=False` keeps it out of the metrics, which describe uploaded images only.
+    """
+    profile = get_profile(profile)
+    start = time.perf_counter()
+
+    if profile.max_size and max(image.size) > profile.max_size:
+        image = image.copy()
+        image.thumbnail((profile.max_size, profile.max_size), Image.LANCZOS)
+
+    if profile.palette and image.mode != 'P':
+        image = image.quantize(256, method=Image.FASTOCTREE)
+
+    buf = BytesIO()
+    image.save(buf, profile.format, **profile.options)
+    buf.seek(0)
+
+    if not record:
+        return buf
+
+    with _lock:
+        stats = _metrics.setdefault(profile.name, EncodeStats())
+        stats.count += 1
+        stats.bytes += buf.getbuffer().nbytes
+        stats.seconds += time.perf_counter() - start
+    return buf
+
+def get_metrics() -> dict[str, EncodeStats]:
+    """
+    The number of images, total bytes and total encode time per profile since the process started.
+    """
+    with _lock:
+        return dict(_metrics)
@@ -1,13 +1,12 @@
 from __future__ import annotations
 
 from typing import Optional
-import random
 
 import discord
 from discord.ext import commands
-from english_words import english_words_lower_alpha_set
 
 from .utils import DiscordColor, DEFAULT_COLOR
+from .lexicon import english_lexicon
 
 BLANK = '  \u200b'
 STAGES: list[str] = ['''
@@ -97,7 +96,7 @@ class Hangman:
 
     def __init__(self) -> None:
         self._alpha: list[str] = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z']
-        self._all_words = tuple(english_words_lower_alpha_set)
+        self._all_words = english_lexicon()
         self.word = self.get_word()
         self.letters: list[str] = list(self.word)
         
@@ -111,7 +110,7 @@ class Hangman:
         self.game_over: bool = False
 
     def get_word(self) -> str:
-        word = random.choice(self._all_words).lower()
+        word = self._all_words.random().lower()
         if len(word) == 1:
             word = self.get_word()
         return word
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from typing import Callable, Iterable, Iterator, Optional
+import mmap
+import os
+import pathlib
+import random
+import struct
+import threading
+
+from .utils import ASSETS_DIR, cache_path
+
+__all__ = (
+    'Lexicon',
+    'get_lexicon',
+    'wordle_lexicon',
+    'english_lexicon',
+)
+
+# file layout: header, followed by `count` sorted records of `width` bytes each, padded with NUL bytes
+MAGIC = b'DGLX'
+HEADER = struct.Struct('<4sIH')
+
+_lexicons: dict[str, Lexicon] = {}
+_lock = threading.Lock()
+
+class Lexicon:
+    """
+    A read-only, sorted word list backed by a memory-mapped file.
+
+    Membership tests are binary searches over fixed-width records,
+    and random draws are a single record lookup, the file is shared by every process mapping it.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count, self._width = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a lexicon file')
+
+    @classmethod
+    def build(cls, path: pathlib.Path, words: Iterable[str]) -> Lexicon:
+        records = sorted({word.encode() for word in words if word})
+        width = max(map(len, records), default=1)
+
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(records), width))
+            f.write(b''.join(record.ljust(width, b'\0') for record in records))
+        os.replace(tmp, path)
+
+        return cls(path)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, index: int) -> bytes:
+        offset = HEADER.size + index * self._width
+        return self._mmap[offset:offset + self._width].rstrip(b'\0')
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('lexicon index out of range')
+        return self._record(index).decode()
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._count):
+            yield self._record(index).decode()
+
+    def index(self, word: str) -> int:
+        key = word.encode()
+        if len(key) > self._width:
+            return -1
+
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = self._record(mid)
+            if record < key:
+                lo = mid + 1
+            elif record > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def __contains__(self, word: object) -> bool:
+        return isinstance(word, str) and self.index(word) >= 0
+
+    def random(self, rng: Optional[random.Random] = None) -> str:
+        return self[(rng or random).randrange(self._count)]
+
+def get_lexicon(name: str, words: Callable[[], Iterable[str]]) -> Lexicon:
+    """
+    Returns the process-wide lexicon called `name`, 
+    the backing file is only built (from `words()`) if no process has built it yet.
+    """
+    if (lexicon := _lexicons.get(name)) is not None:
+        return lexicon
+
+    with _lock:
+        if (lexicon := _lexicons.get(name)) is None:
+            path = cache_path(f'{name}.lex')
+            try:
+                lexicon = Lexicon(path)
+            except (OSError, ValueError, struct.error):
+                lexicon = Lexicon.build(path, words())
+            _lexicons[name] = lexicon
+    return lexicon
+
+def _source_key(path: pathlib.Path) -> str:
+    stat = path.stat()
+    return f'{stat.st_size:x}-{int(stat.st_mtime):x}'
+
+def wordle_lexicon() -> Lexicon:
+    source = ASSETS_DIR / 'words.txt'
+
+    def words() -> list[str]:
+        with open(source, 'r') as f:
+            return f.read().splitlines()
+
+    return get_lexicon(f'wordle-{_source_key(source)}', words)
+
+def english_lexicon() -> Lexicon:
+    def words() -> set[str]:
+        from english_words import english_words_lower_alpha_set
+        return english_words_lower_alpha_set
+
+    return get_lexicon('english', words)
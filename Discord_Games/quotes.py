@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, ClassVar, NamedTuple, Optional
+import asyncio
+import bisect
+import functools
+import logging
+import pathlib
+import random
+import textwrap
+import weakref
+
+import aiohttp
+
+from .utils import ASSETS_DIR
+
+if TYPE_CHECKING:
+    from discord.ext import commands
+
+__all__ = (
+    'Quote',
+    'QuoteCorpus',
+    'QuoteSource',
+    'CorpusQuoteSource',
+    'HTTPQuoteSource',
+    'get_corpus',
+    'wrap_text',
+)
+
+_log = logging.getLogger(__name__)
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# characters per line of the rendered TypeRacer image,
+# `wrap_text` is always called with it positionally so that every caller shares the same cache entries
+WRAP_WIDTH = 25
+
+class Quote(NamedTuple):
+    content: str
+    author: Optional[str] = None
+
+    @property
+    def words(self) -> int:
+        return len(self.content.split())
+
+    @property
+    def difficulty(self) -> str:
+        # longer quotes, longer words and more punctuation / capitals to hit make a quote harder to type
+        text = self.content
+        awkward = sum(not (char.isalpha() and char.islower()) and not char.isspace() for char in text)
+        score = len(text) / 40 + len(text.replace(' ', '')) / max(self.words, 1) / 2 + awkward / 4
+        if score < 3.9:
+            return 'easy'
+        elif score < 4.8:
+            return 'medium'
+        return 'hard'
+
+class QuoteCorpus:
+    """
+    An immutable collection of quotes, sorted by length and bucketed by difficulty,
+    so that a random draw within a length range is two binary searches.
+    """
+
+    def __init__(self, quotes: list[Quote]) -> None:
+        self.quotes = sorted(quotes, key=lambda q: len(q.content))
+        self.lengths = [len(q.content) for q in self.quotes]
+        self.word_counts = [q.words for q in self.quotes]
+
+        # indices into `self.quotes` per difficulty, also ordered by length
+        self.buckets: dict[str, list[int]] = {difficulty: [] for difficulty in DIFFICULTIES}
+        for i, quote in enumerate(self.quotes):
+            self.buckets[quote.difficulty].append(i)
+        self._bucket_lengths = {
+            difficulty: [self.lengths[i] for i in indices] for difficulty, indices in self.buckets.items()
+        }
+
+    @classmethod
+    def from_file(cls, path: pathlib.Path) -> QuoteCorpus:
+        quotes = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                content, _, author = line.rstrip('\n').partition('\t')
+                if content:
+                    quotes.append(Quote(content, author or None))
+        return cls(quotes)
+
+    def __len__(self) -> int:
+        return len(self.quotes)
+
+    def candidates(
+        self,
+        *,
+        difficulty: Optional[str] = None,
+        min_length: int = 0,
+        max_length: Optional[int] = None,
+        min_words: int = 0,
+        max_words: Optional[int] = None,
+    ) -> list[int]:
+        if difficulty is None:
+            indices, lengths = range(len(self.quotes)), self.lengths
+        elif difficulty in self.buckets:
+            indices, lengths = self.buckets[difficulty], self._bucket_lengths[difficulty]
+        else:
+            raise ValueError(f'difficulty must be one of {DIFFICULTIES}, not {difficulty!r}')
+
+        lo = bisect.bisect_left(lengths, min_length)
+        hi = bisect.bisect_right(lengths, max_length) if max_length is not None else len(lengths)
+        indices = indices[lo:hi]
+
+        if min_words or max_words is not None:
+            indices = [
+                i for i in indices
+                if min_words <= self.word_counts[i] and (max_words is None or self.word_counts[i] <= max_words)
+            ]
+        return indices
+
+    def random(self, **filters) -> Quote:
+        indices = self.candidates(**filters)
+        if not indices:
+            raise LookupError(f'No quotes match {filters}')
+        return self.quotes[random.choice(indices)]
+
+@functools.lru_cache(maxsize=None)
+def get_corpus(path: Optional[pathlib.Path] = None) -> QuoteCorpus:
+    return QuoteCorpus.from_file(path or ASSETS_DIR / 'quotes.tsv')
+
+@functools.lru_cache(maxsize=512)
+def wrap_text(text: str, width: int = WRAP_WIDTH) -> str:
+    return "\n".join(textwrap.wrap(text, width=width))
+
+class QuoteSource:
+    """
+    Base class for the sentence providers of `TypeRacer`,
+    subclasses implement `get_quote` and may accept any filters they understand.
+    """
+
+    async def get_quote(self, **filters) -> Quote:
+        raise NotImplementedError
+
+class CorpusQuoteSource(QuoteSource):
+    """
+    Draws quotes from the bundled, indexed corpus, or from a custom tab separated `content\\tauthor` file.
+    The corpus is parsed on first use and shared by every source and race afterwards.
+    """
+
+    def __init__(self, path: Optional[pathlib.Path] = None, **filters) -> None:
+        self.path = pathlib.Path(path) if path else None
+        self.filters = filters
+
+    @property
+    def corpus(self) -> QuoteCorpus:
+        return get_corpus(self.path)
+
+    async def get_quote(self, **filters) -> Quote:
+        return self.corpus.random(**{**self.filters, **filters})
+
+class HTTPQuoteSource(QuoteSource):
+    """
+    Fetches quotes from a JSON API such as quotable.io over one pooled session.
+
+    A background task keeps up to `prefetch` quotes (already wrapped for rendering) queued,
+    retrying with exponential backoff while the API is failing, so that a race start rarely waits on the network.
+
+    Prefer `from_bot`, which `TypeRacer.start(use_api=True)` uses, over creating sources per race:
+    every source owns a session and a prefetch task until `close` is called.
+    """
+    SENTENCE_URL: ClassVar[str] = "https://api.quotable.io/random"
+
+    _bot_sources: ClassVar[weakref.WeakKeyDictionary[commands.Bot, dict[str, HTTPQuoteSource]]] = weakref.WeakKeyDictionary()
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        *,
+        session: Optional[aiohttp.ClientSession] = None,
+        prefetch: int = 5,
+        timeout: float = 10.0,
+        max_backoff: float = 60.0,
+    ) -> None:
+        self.url = url or self.SENTENCE_URL
+        self.prefetch = prefetch
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+
+        self._session = session
+        self._owns_session = session is None
+        self._queue: Optional[asyncio.Queue[Quote]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_bot(cls, bot: commands.Bot, url: Optional[str] = None, **kwargs) -> HTTPQuoteSource:
+        """
+        Returns the source for `url` shared by every race of `bot`, creating it on first use.
+        """
+        sources = cls._bot_sources.setdefault(bot, {})
+        url = url or cls.SENTENCE_URL
+        source = sources.get(url)
+        if source is None:
+            source = sources[url] = cls(url, **kwargs)
+        return source
+
+    @classmethod
+    async def close_bot(cls, bot: commands.Bot) -> None:
+        """
+        Closes every source created by `from_bot` for `bot`, call it when the bot shuts down.
+        """
+        for source in cls._bot_sources.pop(bot, {}).values():
+            await source.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._owns_session = True
+        return self._session
+
+    async def fetch(self) -> Quote:
+        async with self.session.get(self.url) as r:
+            if r.ok:
+                data = await r.json()
+                if not isinstance(data, dict) or not isinstance(data.get("content"), str):
+                    raise RuntimeError(f"Unexpected response from {self.url}: {data!r:.100}")
+                return Quote(data["content"], data.get("author"))
+            else:
+                raise RuntimeError(f"HTTP request raised an error: {r.status}; {r.reason}")
+
+    async def _fill(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                quote = await self.fetch()
+                wrap_text(quote.content, WRAP_WIDTH)
+            except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+                _log.warning('Fetching a quote from %s failed, retrying in %.0fs: %s', self.url, backoff, e)
+            except Exception:
+                # anything unexpected must not end the task, or the queue silently stays empty
+                _log.exception('Unexpected error while prefetching a quote from %s, retrying in %.0fs', self.url, backoff)
+            else:
+                backoff = 1.0
+                await self._queue.put(quote)
+                continue
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def start(self) -> None:
+        """
+        Starts the background prefetch task, this is done implicitly by `get_quote`.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.prefetch)
+        if self.prefetch > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._fill())
+
+    async def get_quote(self, **filters) -> Quote:
+        self.start()
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return await self.fetch()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+        self._session = None
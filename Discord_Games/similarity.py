@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from typing import Generic, Iterable, Optional, TypeVar
+from collections import Counter
+import heapq
+
+__all__ = (
+    'Matcher',
+    'TrigramIndex',
+    'distance',
+    'ratio',
+)
+
+T = TypeVar('T')
+
+class Matcher:
+    """
+    Compares texts against a fixed target using the bit-parallel edit distance of Myers / Hyyrö,
+    every character of a compared text costs a constant number of bitwise operations on `len(target)` bit integers.
+    """
+
+    def __init__(self, target: str) -> None:
+        self.target = target
+        self._length = len(target)
+        self._mask = (1 << self._length) - 1
+        self._last = 1 << (self._length - 1) if self._length else 0
+
+        self._peq: dict[str, int] = {}
+        for i, char in enumerate(target):
+            self._peq[char] = self._peq.get(char, 0) | (1 << i)
+
+    def distance(self, text: str, max_distance: Optional[int] = None) -> Optional[int]:
+        """
+        Returns the levenshtein distance between `text` and the target,
+        or `None` as soon as it is certain to exceed `max_distance`.
+        """
+        m, n = self._length, len(text)
+
+        if max_distance is not None and abs(m - n) > max_distance:
+            return None
+        if not m:
+            return n
+
+        mask, last, peq = self._mask, self._last, self._peq
+        pv, mv, score = mask, 0, m
+
+        # the final distance can drop by at most one per remaining character,
+        # so give up once `score - (n - j - 1)` exceeds `max_distance`
+        bound = n - 1 + (max_distance if max_distance is not None else m + n)
+
+        for j, char in enumerate(text):
+            eq = peq.get(char, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+
+            ph = mv | (~(xh | pv) & mask)
+            mh = pv & xh
+
+            if ph & last:
+                score += 1
+                if score + j > bound:
+                    return None
+            elif mh & last:
+                score -= 1
+
+            ph = ((ph << 1) | 1) & mask
+            mh = (mh << 1) & mask
+
+            pv = mh | (~(xv | ph) & mask)
+            mv = ph & xv
+
+        if max_distance is not None and score > max_distance:
+            return None
+        return score
+
+    def ratio(self, text: str, threshold: float = 0.0) -> float:
+        """
+        Returns the similarity between `text` and the target, from 0 to 1,
+        results below `threshold` are cut off early and returned as 0.
+        """
+        longest = max(self._length, len(text))
+        if not longest:
+            return 1.0
+
+        max_distance = int(longest * (1 - threshold) + 1e-9)
+        dist = self.distance(text, max_distance)
+
+        if dist is None:
+            return 0.0
+        return 1 - dist / longest
+
+def _trigrams(text: str) -> set[str]:
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex(Generic[T]):
+    """
+    Finds the strings closest to a query among many fixed ones, each mapped to a value.
+    Candidates are ranked by the trigrams they share with the query first,
+    so the edit distance is only computed for a handful of them.
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, T]]) -> None:
+        self.keys: list[str] = []
+        self.values: list[T] = []
+        self._sizes: list[int] = []
+        self._postings: dict[str, list[int]] = {}
+
+        for key, value in entries:
+            grams = _trigrams(key)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(len(self.keys))
+
+            self.keys.append(key)
+            self.values.append(value)
+            self._sizes.append(len(grams))
+
+    def search(
+        self,
+        query: str,
+        *,
+        limit: int = 5,
+        max_distance: Optional[int] = None,
+        candidates: int = 32,
+    ) -> list[tuple[str, T, int]]:
+        """
+        Returns up to `limit` (key, value, distance) tuples nearest to `query`, one per distinct value,
+        only keys within `max_distance` edits are returned if it is given.
+        """
+        grams = _trigrams(query)
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        # dice coefficient of the trigram sets
+        ranked = heapq.nlargest(candidates, shared, key=lambda i: shared[i] / (len(grams) + self._sizes[i]))
+
+        matcher = Matcher(query)
+        scored = []
+        for i in ranked:
+            dist = matcher.distance(self.keys[i], max_distance)
+            if dist is not None:
+                scored.append((dist, i))
+        scored.sort()
+
+        results = []
+        seen = set()
+        for dist, i in scored:
+            if self.values[i] not in seen:
+                seen.add(self.values[i])
+                results.append((self.keys[i], self.values[i], dist))
+                if len(results) == limit:
+                    break
+        return results
+
+def distance(a: str, b: str, max_distance: Optional[int] = None) -> Optional[int]:
+    return Matcher(a).distance(b, max_distance)
+
+def ratio(a: str, b: str, threshold: float = 0.0) -> float:
+    return Matcher(a).ratio(b, threshold)
@@ -1,31 +1,209 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional
-from io import BytesIO
+from typing import TYPE_CHECKING, ClassVar, Iterator, Optional
+from array import array
 import asyncio
 import random
 import pathlib
 
+import numpy as np
 import discord
 from discord.ext import commands
 from PIL import Image, ImageDraw, ImageFont
 
 from .utils import executor
+from .encoding import encode, filename
 
 if TYPE_CHECKING:
     Board = list[list[int]]
 
+# The board is packed into a single 64 bit integer,
+# each tile is stored as the exponent of its value in 4 bits (0 being an empty tile)
+# row `i` occupies bits `16*i` to `16*i + 15`, and column `j` of that row the nibble at `16*i + 4*j`
+ROW_MASK = 0xFFFF
+
+# the order of these directions defines the bits of `Twenty48.legal_moves`
+DIRECTIONS: tuple[str, ...] = ('⬅️', '➡️', '⬆️', '⬇️')
+
+def _reverse_row(row: np.ndarray) -> np.ndarray:
+    return (
+        ((row & 0x000F) << 12) | ((row & 0x00F0) << 4) | 
+        ((row & 0x0F00) >> 4) | ((row & 0xF000) >> 12)
+    )
+
+def _build_tables() -> tuple[list[int], list[int], list[int], list[int]]:
+    # slides every possible row at once, the same way `twenty_48_batch` slides boards
+    rows = np.arange(ROW_MASK + 1, dtype=np.int64)
+    shifts = np.arange(0, 16, 4, dtype=np.int64)
+    tiles = (rows[:, None] >> shifts) & 0xF
+
+    def compress(tiles: np.ndarray) -> np.ndarray:
+        return np.take_along_axis(tiles, np.argsort(tiles == 0, axis=1, kind='stable'), axis=1)
+
+    tiles = compress(tiles)
+    score = np.zeros(len(rows), dtype=np.int64)
+    for j in range(3):
+        merge = (tiles[:, j] == tiles[:, j + 1]) & (tiles[:, j] != 0)
+        merged = np.minimum(tiles[merge, j] + 1, 0xF)
+        tiles[merge, j] = merged
+        tiles[merge, j + 1] = 0
+        score[merge] += 1 << merged
+    left = (compress(tiles) << shifts).sum(axis=1)
+
+    reverse = _reverse_row(rows)
+    right = _reverse_row(left[reverse])
+
+    # plain lists of ints, indexing them is faster than indexing arrays for a single board
+    return left.tolist(), right.tolist(), score.tolist(), score[reverse].tolist()
+
+# the rows slid to the left / right, and the score gained by sliding them, built once on import
+_ROW_LEFT, _ROW_RIGHT, _SCORE_LEFT, _SCORE_RIGHT = _build_tables()
+
+def _move_rows(board: int, table: list[int]) -> int:
+    return (
+        table[board & ROW_MASK] | 
+        table[(board >> 16) & ROW_MASK] << 16 | 
+        table[(board >> 32) & ROW_MASK] << 32 | 
+        table[(board >> 48) & ROW_MASK] << 48
+    )
+
+def _transpose(board: int) -> int:
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+def _move(board: int, direction: str) -> int:
+    if direction == '⬅️':
+        return _move_rows(board, _ROW_LEFT)
+    elif direction == '➡️':
+        return _move_rows(board, _ROW_RIGHT)
+    elif direction == '⬆️':
+        return _transpose(_move_rows(_transpose(board), _ROW_LEFT))
+    elif direction == '⬇️':
+        return _transpose(_move_rows(_transpose(board), _ROW_RIGHT))
+    return board
+
+def _score(board: int, direction: str) -> int:
+    if direction in ('⬆️', '⬇️'):
+        board = _transpose(board)
+
+    table = _SCORE_LEFT if direction in ('⬅️', '⬆️') else _SCORE_RIGHT
+    return (
+        table[board & ROW_MASK] + 
+        table[(board >> 16) & ROW_MASK] + 
+        table[(board >> 32) & ROW_MASK] + 
+        table[(board >> 48) & ROW_MASK]
+    )
+
+def _legal_moves(board: int) -> int:
+    return sum(
+        1 << i for i, direction in enumerate(DIRECTIONS) 
+        if _move(board, direction) != board
+    )
+
+def _pack(board: Board) -> int:
+    packed = 0
+    for i, row in enumerate(board):
+        for j, tile in enumerate(row):
+            if tile:
+                packed |= (tile.bit_length() - 1) << (16 * i + 4 * j)
+    return packed
+
+def _unpack(board: int) -> Board:
+    return [
+        [
+            1 << exp if (exp := (board >> (16 * i + 4 * j)) & 0xF) else 0 
+            for j in range(4)
+        ] 
+        for i in range(4)
+    ]
+
+class History:
+    """
+    A compact log of a game, used for undoing moves and replaying finished games.
+
+    Every move is stored in a single byte: the index of its direction in `DIRECTIONS` in bits 4-5,
+    and the cell the new tile spawned in in bits 0-3 (bit 7 is set when nothing spawned).
+    Only the packed boards and scores preceding the last `max_undo` moves are kept for undoing.
+    """
+
+    NO_SPAWN: ClassVar[int] = 0x80
+
+    def __init__(self, start: int, *, max_undo: int = 10) -> None:
+        self.start = start
+        self.max_undo = max_undo
+
+        self.moves = array('B')
+        self._boards = array('Q')
+        self._scores = array('Q')
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._boards)
+
+    def record(self, direction: str, board: int, score: int, spawned: Optional[int]) -> None:
+        move = DIRECTIONS.index(direction) << 4
+        move |= self.NO_SPAWN if spawned is None else spawned
+        self.moves.append(move)
+
+        if self.max_undo <= 0:
+            return
+
+        if len(self._boards) >= self.max_undo:
+            del self._boards[0]
+            del self._scores[0]
+
+        self._boards.append(board)
+        self._scores.append(score)
+
+    def undo(self) -> Optional[tuple[int, int]]:
+        if not self._boards:
+            return None
+
+        self.moves.pop()
+        return self._boards.pop(), self._scores.pop()
+
+    def replay(self) -> Iterator[tuple[str, int]]:
+        board = self.start
+        for move in self.moves:
+            direction = DIRECTIONS[(move >> 4) & 0x3]
+            board = _move(board, direction)
+
+            if not move & self.NO_SPAWN:
+                board |= 1 << (4 * (move & 0xF))
+            yield direction, board
+
+    def verify(self, board: int) -> bool:
+        final = self.start
+        for _, final in self.replay():
+            pass
+        return final == board
+
 class Twenty48:
     player: discord.Member
 
+    # pre-rasterized tiles, keyed by the exponent of the tile, shared across every session
+    _tile_cache: ClassVar[dict[int, Image.Image]] = {}
+
     def __init__(
         self, 
         number_to_display_mapping: dict[str, str] = {},
         *,
         render_image: bool = False,
+        max_undo: int = 10,
     ) -> None:
         
-        self.board: Board = [[0 for _ in range(4)] for _ in range(4)]
+        self._board: int = 0
+        self.score: int = 0
+        self.history = History(self._board, max_undo=max_undo)
         self.message: Optional[discord.Message] = None
         
         self._controls = ['➡️', '⬅️', '⬇️', '⬆️']
@@ -64,75 +242,87 @@ class Twenty48:
             self.IMG_LENGTH = self.BORDER_W * 2 + self.SQ_S * 4 + self.SPACE_W * 3
 
             self._font = ImageFont.truetype(
-                fr'{pathlib.Path(__file__).parent}\assets\ClearSans-Bold.ttf', 50
+                str(pathlib.Path(__file__).parent / 'assets' / 'ClearSans-Bold.ttf'), 50
             )
+
+            # the last rendered canvas of this session, and the packed board it depicts
+            self._canvas: Optional[Image.Image] = None
+            self._rendered: int = 0
         
-    def _reverse(self, board: Board) -> Board:
-        return [row[::-1] for row in board]
-
-    def _transp(self, board: Board) -> Board:
-        return [[board[i][j] for i in range(4)] for j in range(4)]
-
-    def _merge(self, board: Board) -> Board:
-        for i in range(4):
-            for j in range(3):
-                tile = board[i][j]
-                if tile == board[i][j + 1] and tile != 0:
-                    board[i][j] *= 2
-                    board[i][j + 1] = 0
-        return board
-            
-    def _compress(self, board: Board) -> Board:
-        new_board = [[0 for _ in range(4)] for _ in range(4)]
-        for i in range(4):
-            pos = 0
-            for j in range(4):
-                if board[i][j] != 0:
-                    new_board[i][pos] = board[i][j]
-                    pos += 1
-        return new_board
-
-    def move_left(self) -> None:
-        stage = self._compress(self.board)
-        stage = self._merge(stage)
-        stage = self._compress(stage)
-        self.board = stage
-        
-    def move_right(self) -> None:
-        stage = self._reverse(self.board)
-        stage = self._compress(stage)
-        stage = self._merge(stage)
-        stage = self._compress(stage)
-        stage = self._reverse(stage)
-        self.board = stage
-        
-    def move_up(self) -> None:
-        stage = self._transp(self.board)
-        stage = self._compress(stage)
-        stage = self._merge(stage)
-        stage = self._compress(stage)
-        stage = self._transp(stage)
-        self.board = stage
-        
-    def move_down(self) -> None:
-        stage = self._transp(self.board)
-        stage = self._reverse(stage)
-        stage = self._compress(stage)
-        stage = self._merge(stage)
-        stage = self._compress(stage)
-        stage = self._reverse(stage)
-        stage = self._transp(stage)
-        self.board = stage
-
-    def spawn_new(self) -> None:
-        board  = self.board
-        zeroes = [(j, i) for j, sub in enumerate(board) for i, el in enumerate(sub) if el == 0]
+    @property
+    def board(self) -> Board:
+        return _unpack(self._board)
+
+    @board.setter
+    def board(self, board: Board) -> None:
+        self._board = _pack(board)
+
+    def move_left(self) -> tuple[bool, int]:
+        return self.make_move('⬅️')
+
+    def move_right(self) -> tuple[bool, int]:
+        return self.make_move('➡️')
+
+    def move_up(self) -> tuple[bool, int]:
+        return self.make_move('⬆️')
+
+    def move_down(self) -> tuple[bool, int]:
+        return self.make_move('⬇️')
+
+    def make_move(self, direction: str) -> tuple[bool, int]:
+        board = _move(self._board, direction)
+
+        if board == self._board:
+            return False, 0
+
+        gained = _score(self._board, direction)
+        self._board = board
+        self.score += gained
+        return True, gained
+
+    def play(self, direction: str) -> tuple[bool, int]:
+        board, score = self._board, self.score
+        changed, gained = self.make_move(direction)
+
+        if changed:
+            spawned = self.spawn_new()
+            self.history.record(direction, board, score, spawned)
+        return changed, gained
+
+    def undo(self) -> bool:
+        if (previous := self.history.undo()) is None:
+            return False
+
+        self._board, self.score = previous
+        return True
+
+    def legal_moves(self) -> int:
+        return _legal_moves(self._board)
+
+    def is_legal(self, direction: str) -> bool:
+        return bool(self.legal_moves() & (1 << DIRECTIONS.index(direction)))
+
+    def is_over(self) -> bool:
+        return not self.legal_moves()
+
+    def get_content(self) -> Optional[str]:
+        content = None if self._render_image else self.number_to_emoji()
+
+        if self.is_over():
+            game_over = f'**Game Over!** Final score: **{self.score}**'
+            content = f'{content}\n{game_over}' if content else game_over
+        return content
+
+    def spawn_new(self) -> Optional[int]:
+        board = self._board
+        zeroes = [i for i in range(0, 64, 4) if not (board >> i) & 0xF]
 
         if not zeroes:
-            return
+            return None
 
-        i, j = random.choice(zeroes)
-        board[i][j] = 2
+        shift = random.choice(zeroes)
+        self._board = board | (1 << shift)
+        return shift // 4
 
     def number_to_emoji(self) -> str:
         board = self.board
@@ -147,32 +337,46 @@ class Twenty48:
             game_string += "".join(row) + "\n"
         return game_string
 
+    def _get_tile(self, exp: int) -> Image.Image:
+        if (tile := self._tile_cache.get(exp)) is not None:
+            return tile
+
+        SQ = self.SQ_S
+        value = str(1 << exp) if exp else '0'
+        color, fsize = self._color_mapping.get(value, self._color_mapping['8192'])
+
+        tile = Image.new('RGB', (SQ + 1, SQ + 1), self.BG_CLR)
+        cursor = ImageDraw.Draw(tile)
+        cursor.rounded_rectangle((0, 0, SQ, SQ), radius=5, width=0, fill=color)
+
+        if value != '0':
+            font = self._font.font_variant(size=fsize)
+            text_fill = self.DARK_CLR if value in ('2', '4') else self.LIGHT_CLR
+            cursor.text((SQ/2, SQ/2), value, font=font, anchor='mm', fill=text_fill)
+
+        self._tile_cache[exp] = tile
+        return tile
+
     @executor()
     def render_image(self) -> discord.File:
-        SQ = self.SQ_S
-        with Image.new('RGB', (self.IMG_LENGTH, self.IMG_LENGTH), self.BG_CLR) as img:
-            cursor = ImageDraw.Draw(img)
-            
-            x = y = self.BORDER_W
-            for row in self.board:
-                for tile in row:
-                    tile = str(tile)
-                    color, fsize = self._color_mapping.get(tile)
-                    font = self._font.font_variant(size=fsize)
-                    cursor.rounded_rectangle((x, y, x+SQ, y+SQ), radius=5, width=0, fill=color)
-
-                    if tile != '0':
-                        text_fill = self.DARK_CLR if tile in ('2', '4') else self.LIGHT_CLR
-                        cursor.text((x+SQ/2, y+SQ/2), tile, font=font, anchor='mm', fill=text_fill)
-
-                    x += SQ + self.SPACE_W
-                x = self.BORDER_W
-                y += SQ + self.SPACE_W
-        
-            buf = BytesIO()
-            img.save(buf, 'PNG')
-        buf.seek(0)
-        return discord.File(buf, '2048.png')
+        board = self._board
+
+        if self._canvas is None:
+            self._canvas = Image.new('RGB', (self.IMG_LENGTH, self.IMG_LENGTH), self.BG_CLR)
+            changed = range(16)
+        else:
+            diff = board ^ self._rendered
+            changed = [cell for cell in range(16) if (diff >> (4 * cell)) & 0xF]
+
+        for cell in changed:
+            i, j = divmod(cell, 4)
+            x = self.BORDER_W + j * (self.SQ_S + self.SPACE_W)
+            y = self.BORDER_W + i * (self.SQ_S + self.SPACE_W)
+            self._canvas.paste(self._get_tile((board >> (4 * cell)) & 0xF), (x, y))
+
+        self._rendered = board
+
+        return discord.File(encode(self._canvas), filename('2048'))
 
     async def start(
         self, 
@@ -185,8 +389,9 @@ class Twenty48:
     ) -> None:
 
         self.player = ctx.author
-        self.board[random.randrange(4)][random.randrange(4)] = 2
-        self.board[random.randrange(4)][random.randrange(4)] = 2
+        self.spawn_new()
+        self.spawn_new()
+        self.history.start = self._board
         
         if self._render_image:
             image = await self.render_image()
@@ -216,17 +421,7 @@ class Twenty48:
             if delete_button and emoji == "⏹️":
                 return await self.message.delete()
 
-            if emoji == '➡️':
-                self.move_right()
-
-            elif emoji == '⬅️':
-                self.move_left()
-
-            elif emoji == '⬇️':
-                self.move_down()
-
-            elif emoji == '⬆️':
-                self.move_up()
+            changed, _ = self.play(emoji)
 
             if remove_reaction_after:
                 try:
@@ -234,11 +429,14 @@ class Twenty48:
                 except discord.DiscordException:
                     pass
 
-            self.spawn_new()
+            if not changed:
+                continue
 
             if self._render_image:
                 image = await self.render_image()
-                await self.message.edit(attachments=[image])
+                await self.message.edit(content=self.get_content(), attachments=[image])
             else:
-                board_string = self.number_to_emoji()
-                await self.message.edit(content=board_string)
\ No newline at end of file
+                await self.message.edit(content=self.get_content())
+
+            if self.is_over():
+                return
\ No newline at end of file
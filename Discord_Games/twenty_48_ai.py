@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from typing import Optional
+import functools
+import time
+
+from .twenty_48 import DIRECTIONS, ROW_MASK, _move, _transpose
+
+__all__ = (
+    'Expectimax',
+)
+
+# heuristic weights, scores are computed per row (and per column through the transpose)
+LOST_PENALTY = 200000.0
+EMPTY_WEIGHT = 270.0
+MERGES_WEIGHT = 700.0
+MONOTONIC_WEIGHT = 47.0
+SUM_WEIGHT = 11.0
+
+class _SearchTimeout(Exception):
+    pass
+
+@functools.lru_cache(maxsize=None)
+def _row_heuristic(row: int) -> float:
+    tiles = [(row >> i) & 0xF for i in range(0, 16, 4)]
+
+    empty = tiles.count(0)
+    total = sum(tile ** 3.5 for tile in tiles)
+
+    merges = 0
+    previous = 0
+    counter = 0
+    for tile in tiles:
+        if not tile:
+            continue
+        if tile == previous:
+            counter += 1
+        elif counter:
+            merges += 1 + counter
+            counter = 0
+        previous = tile
+    if counter:
+        merges += 1 + counter
+
+    mono_left = mono_right = 0.0
+    for a, b in zip(tiles, tiles[1:]):
+        if a > b:
+            mono_left += a ** 4 - b ** 4
+        else:
+            mono_right += b ** 4 - a ** 4
+
+    return (
+        LOST_PENALTY + 
+        EMPTY_WEIGHT * empty + 
+        MERGES_WEIGHT * merges - 
+        MONOTONIC_WEIGHT * min(mono_left, mono_right) - 
+        SUM_WEIGHT * total
+    )
+
+def _evaluate(board: int) -> float:
+    transposed = _transpose(board)
+    return sum(
+        _row_heuristic((board >> shift) & ROW_MASK) + 
+        _row_heuristic((transposed >> shift) & ROW_MASK)
+        for shift in (0, 16, 32, 48)
+    )
+
+class Expectimax:
+    """
+    A depth limited expectimax search over packed 2048 boards.
+
+    Search is iteratively deepened up to `max_depth` moves,
+    the deepest fully completed iteration within `time_budget` seconds decides the move.
+    Chance nodes whose probability falls under `min_probability` are evaluated statically.
+    """
+
+    def __init__(
+        self, 
+        *, 
+        max_depth: int = 3, 
+        time_budget: float = 1.0, 
+        min_probability: float = 1e-4,
+    ) -> None:
+
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.min_probability = min_probability
+
+        self._deadline: float = 0.0
+        self._table: dict[int, tuple[int, float]] = {}
+
+    def best_move(self, board: int) -> Optional[str]:
+        self._deadline = time.perf_counter() + self.time_budget
+
+        best = None
+        for depth in range(1, self.max_depth + 1):
+            self._table = {}
+            try:
+                best = self._search_root(board, depth)
+            except _SearchTimeout:
+                break
+        return best
+
+    def _search_root(self, board: int, depth: int) -> Optional[str]:
+        best, best_score = None, -1.0
+
+        for direction in DIRECTIONS:
+            moved = _move(board, direction)
+            if moved == board:
+                continue
+
+            score = self._chance(moved, depth - 1, 1.0)
+            if score > best_score:
+                best, best_score = direction, score
+        return best
+
+    def _max(self, board: int, depth: int, probability: float) -> float:
+        best = 0.0
+        for direction in DIRECTIONS:
+            moved = _move(board, direction)
+            if moved != board:
+                best = max(best, self._chance(moved, depth, probability))
+        return best
+
+    def _chance(self, board: int, depth: int, probability: float) -> float:
+        if depth <= 0 or probability < self.min_probability:
+            return _evaluate(board)
+
+        if time.perf_counter() > self._deadline:
+            raise _SearchTimeout()
+
+        if (cached := self._table.get(board)) and cached[0] >= depth:
+            return cached[1]
+
+        empty = [shift for shift in range(0, 64, 4) if not (board >> shift) & 0xF]
+        if not empty:
+            return _evaluate(board)
+
+        probability /= len(empty)
+        score = sum(
+            self._max(board | (1 << shift), depth - 1, probability) 
+            for shift in empty
+        ) / len(empty)
+
+        self._table[board] = (depth, score)
+        return score
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+__all__ = (
+    'Twenty48Batch',
+)
+
+# direction indices, ordered like `twenty_48.DIRECTIONS`
+LEFT, RIGHT, UP, DOWN = range(4)
+
+def _orient(boards: np.ndarray, direction: int) -> np.ndarray:
+    # returns a view of `boards` in which the given move becomes a move to the left,
+    # every orientation is its own inverse so the same function maps the result back
+    if direction == RIGHT:
+        return boards[:, :, ::-1]
+    elif direction == UP:
+        return boards.transpose(0, 2, 1)
+    elif direction == DOWN:
+        return boards[:, ::-1, ::-1].transpose(0, 2, 1)
+    return boards
+
+def _compress(rows: np.ndarray) -> np.ndarray:
+    order = np.argsort(rows == 0, axis=1, kind='stable')
+    return np.take_along_axis(rows, order, axis=1)
+
+def _slide_left(boards: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    count, size, _ = boards.shape
+    rows = _compress(boards.reshape(count * size, size))
+    gained = np.zeros(count * size, dtype=np.uint64)
+
+    for j in range(size - 1):
+        merge = (rows[:, j] == rows[:, j + 1]) & (rows[:, j] != 0)
+        rows[merge, j] += 1
+        rows[merge, j + 1] = 0
+        gained[merge] += np.left_shift(np.uint64(1), rows[merge, j].astype(np.uint64))
+
+    rows = _compress(rows)
+    return rows.reshape(count, size, size), gained.reshape(count, size).sum(axis=1)
+
+def _slide(boards: np.ndarray, direction: int) -> tuple[np.ndarray, np.ndarray]:
+    moved, gained = _slide_left(np.ascontiguousarray(_orient(boards, direction)))
+    return _orient(moved, direction), gained
+
+class Twenty48Batch:
+    """
+    A headless 2048 engine that steps `count` boards of `size` x `size` at once.
+
+    Boards are stored as tile exponents in a single `(count, size, size)` uint8 array,
+    every operation is vectorized over the whole batch.
+    """
+
+    def __init__(
+        self, 
+        count: int, 
+        *, 
+        size: int = 4, 
+        four_probability: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+
+        self.size = size
+        self.four_probability = four_probability
+        self.rng = np.random.default_rng(seed)
+
+        self.boards = np.zeros((count, size, size), dtype=np.uint8)
+        self.scores = np.zeros(count, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.boards)
+
+    def reset(self) -> None:
+        self.boards[:] = 0
+        self.scores[:] = 0
+        self.spawn()
+        self.spawn()
+
+    def values(self) -> np.ndarray:
+        return np.where(self.boards > 0, np.left_shift(1, self.boards.astype(np.int64)), 0)
+
+    def spawn(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        flat = self.boards.reshape(len(self), -1)
+        empty = flat == 0
+
+        spawned = empty.any(axis=1)
+        if mask is not None:
+            spawned &= mask
+
+        cells = np.argmax(self.rng.random(flat.shape) * empty, axis=1)
+        tiles = np.where(self.rng.random(len(self)) < self.four_probability, 2, 1).astype(np.uint8)
+
+        rows = np.flatnonzero(spawned)
+        flat[rows, cells[rows]] = tiles[rows]
+        return spawned
+
+    def move(self, direction: int) -> tuple[np.ndarray, np.ndarray]:
+        moved, gained = _slide(self.boards, direction)
+        changed = (moved != self.boards).any(axis=(1, 2))
+
+        self.boards[:] = moved
+        self.scores += gained
+        return changed, gained
+
+    def step(self, directions: np.ndarray, *, spawn: bool = True) -> tuple[np.ndarray, np.ndarray]:
+        changed = np.zeros(len(self), dtype=bool)
+        gained = np.zeros(len(self), dtype=np.uint64)
+
+        for direction in (LEFT, RIGHT, UP, DOWN):
+            selected = np.flatnonzero(directions == direction)
+            if not selected.size:
+                continue
+
+            boards = self.boards[selected]
+            moved, moved_gained = _slide(boards, direction)
+
+            self.boards[selected] = moved
+            changed[selected] = (moved != boards).any(axis=(1, 2))
+            gained[selected] = moved_gained
+
+        self.scores += gained
+        if spawn:
+            self.spawn(changed)
+        return changed, gained
+
+    def legal_moves(self) -> np.ndarray:
+        legal = np.zeros((len(self), 4), dtype=bool)
+
+        for direction in (LEFT, RIGHT, UP, DOWN):
+            rows = _orient(self.boards, direction)
+            filled = rows != 0
+
+            slides = ~filled[:, :, :-1] & filled[:, :, 1:]
+            merges = filled[:, :, :-1] & (rows[:, :, :-1] == rows[:, :, 1:])
+            legal[:, direction] = (slides | merges).any(axis=(1, 2))
+        return legal
+
+    def game_over(self) -> np.ndarray:
+        return ~self.legal_moves().any(axis=1)
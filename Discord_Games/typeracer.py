@@ -1,23 +1,91 @@
 from __future__ import annotations
 
-from typing import Optional, ClassVar, Any
+from typing import Optional, ClassVar, Any, Callable
 from datetime import datetime as dt
 from io import BytesIO
 
-import textwrap
 import time
+import functools
+import heapq
 import random
 import asyncio
-import aiohttp
-import difflib
-import pathlib
 
 from PIL import Image, ImageDraw, ImageFont
 import discord
 from discord.ext import commands
 
 from .utils import *
-
+from .similarity import Matcher
+from .quotes import QuoteSource, CorpusQuoteSource, HTTPQuoteSource, WRAP_WIDTH, wrap_text
+
+
+DEFAULT_FONT = str(ASSETS_DIR / 'segoe-ui-semilight-411.ttf')
+FONT_SIZE = 30
+BACKGROUND = (0, 0, 30)
+FOREGROUND = (220, 200, 220)
+
+# fonts, word strips and rendered quotes are cached process-wide,
+# sentences from the corpus repeat often, word-mode races are composed from the strips of their words
+
+@functools.lru_cache(maxsize=None)
+def _get_font(path: str, size: int = FONT_SIZE) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size)
+
+@functools.lru_cache(maxsize=None)
+def _line_spacing(path: str, size: int = FONT_SIZE) -> int:
+    font = _get_font(path, size)
+    cursor = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    return cursor.multiline_textbbox((0, 0), "A\nA", font=font)[3] - cursor.textbbox((0, 0), "A", font=font)[3]
+
+@functools.lru_cache(maxsize=1024)
+def _get_word(word: str, path: str, size: int = FONT_SIZE) -> Image.Image:
+    font = _get_font(path, size)
+    ascent, descent = font.getmetrics()
+    # a coverage mask rather than an opaque strip, so that descenders survive the line below being pasted
+    strip = Image.new("L", (max(int(font.getbbox(word)[2]), 1), ascent + descent), 0)
+    ImageDraw.Draw(strip).text((0, 0), word, font=font, fill=255)
+    return strip
+
+def _save(image: Image.Image) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+@functools.lru_cache(maxsize=256)
+def _render_text(text: str, path: str, size: int = FONT_SIZE) -> bytes:
+    text = wrap_text(text, WRAP_WIDTH)
+    font = _get_font(path, size)
+
+    cursor = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    _, _, x, y = cursor.multiline_textbbox((0, 0), text, font=font)
+
+    with Image.new("RGB", (x+20, y+30), BACKGROUND) as image:
+        cursor = ImageDraw.Draw(image)
+        cursor.multiline_text((10, 10), text, font=font, fill=FOREGROUND)
+        return _save(image)
+
+def _render_words(words: tuple[str, ...], path: str, size: int = FONT_SIZE) -> bytes:
+    font = _get_font(path, size)
+    space = font.getlength(" ")
+    spacing = _line_spacing(path, size)
+
+    # lay the strips out the way `textwrap` and `multiline_text` would
+    lines = [line.split() for line in wrap_text(" ".join(words), WRAP_WIDTH).splitlines()]
+    placed = []
+    width = 0
+    for i, line in enumerate(lines):
+        x = 0.0
+        for word in line:
+            strip = _get_word(word, path, size)
+            placed.append((strip, (10 + round(x), 10 + i * spacing)))
+            width = max(width, round(x) + strip.width)
+            x += font.getlength(word) + space
+
+    height = (len(lines) - 1) * spacing + int(font.getbbox(" ".join(lines[-1]))[3])
+    with Image.new("RGB", (width + 20, height + 30), BACKGROUND) as image:
+        for strip, position in placed:
+            image.paste(FOREGROUND, position, strip)
+        return _save(image)
 
 class TypeRacer:
     SENTENCE_URL: ClassVar[str] = "https://api.quotable.io/random"
@@ -62,43 +130,81 @@ class TypeRacer:
     }
 
     @executor()
-    def _tr_img(self, text: str, font: str) -> BytesIO:
-
-        text = "\n".join(textwrap.wrap(text, width=25))
-
-        font = ImageFont.truetype(font, 30)
-        x, y = font.getsize_multiline(text)
-
-        with Image.new("RGB", (x+20, y+30), (0, 0, 30)) as image:
-            cursor = ImageDraw.Draw(image)
-            cursor.multiline_text((10, 10), text, font=font, fill=(220, 200, 220))
-
-            buffer = BytesIO()
-            image.save(buffer, "PNG")
-            buffer.seek(0)
-            return buffer
+    def _tr_img(self, text: str, font: str, *, words_mode: bool = False) -> BytesIO:
+        if words_mode:
+            return BytesIO(_render_words(tuple(text.split()), font))
+        return BytesIO(_render_text(text, font))
 
     def format_line(self, i: int, x: dict[str, Any]) -> str:
-        return f" • {self.EMOJI_MAP[i]} | {x['user'].mention} in {x['time']:.2f}s | **WPM:** {x['wpm']:.2f} | **ACC:** {x['acc']:.2f}%"
-
-    async def wait_for_tr_response(self, ctx: commands.Context, text: str, *, timeout: int) -> discord.Message:
+        return f" • {self.EMOJI_MAP.get(i, f'**#{i}**')} | {x['user'].mention} in {x['time']:.2f}s | **WPM:** {x['wpm']:.2f} | **ACC:** {x['acc']:.2f}%"
+
+    def format_leaderboard(self, entries: list[dict[str, Any]], *, limit: int = 3900) -> str:
+        # as many lines as fit in `limit` characters, embed descriptions are capped at 4096
+        lines = []
+        length = 0
+        for i, x in enumerate(entries, 1):
+            line = self.format_line(i, x)
+            length += len(line) + 1
+            if length > limit:
+                break
+            lines.append(line)
+        return "\n".join(lines)
+
+    def _result(self, message: discord.Message, elapsed: float, words: int, accuracy: float) -> dict[str, Any]:
+        wpm = words / (elapsed / 60)
+        return {
+            "user": message.author,
+            "time": elapsed,
+            "wpm" : wpm,
+            "acc" : accuracy * 100,
+            "net" : wpm * accuracy,
+        }
+
+    async def wait_for_tr_response(
+        self,
+        ctx: commands.Context,
+        text: str,
+        *,
+        timeout: Optional[float],
+        large_race: bool = False,
+        leaderboard_size: int = 10,
+        update_interval: float = 3.0,
+    ) -> discord.Message:
 
         self._embed.description = ""
 
         text = text.lower().replace("\n", " ")
+        words = len(text.split(" "))
+        matcher = Matcher(text)
         winners = []
+        finished: set[int] = set()
         start = time.perf_counter()
+        deadline = start + timeout if timeout is not None else None
+
+        # accuracy of the messages that passed the check, so it is only computed once
+        accuracies: dict[int, float] = {}
+
+        def check(m: discord.Message) -> bool:
+            if m.channel == ctx.channel and not m.author.bot and m.author.id not in finished:
+                sim = matcher.ratio(m.content.lower().replace("\n", " "), threshold=0.9)
+                if sim >= 0.9:
+                    accuracies[m.id] = sim
+                    return True
+            return False
+
+        if large_race:
+            return await self._wait_for_large_race(
+                ctx, check, words, accuracies, finished,
+                start=start,
+                deadline=deadline,
+                leaderboard_size=leaderboard_size,
+                update_interval=update_interval,
+            )
 
         while True:
-
-            def check(m: discord.Message) -> bool:
-                content = m.content.lower().replace("\n", " ")
-                if m.channel == ctx.channel and not m.author.bot and m.author not in map(lambda m: m["user"], winners):
-                    sim = difflib.SequenceMatcher(None, content, text).ratio()
-                    return sim >= 0.9
-
             try:
-                message: discord.Message = await ctx.bot.wait_for("message", timeout=timeout, check=check)
+                remaining = max(deadline - time.perf_counter(), 0) if deadline is not None else None
+                message: discord.Message = await ctx.bot.wait_for("message", timeout=remaining, check=check)
             except asyncio.TimeoutError:
                 if winners:
                     break
@@ -106,15 +212,8 @@ class TypeRacer:
                     return await ctx.reply("Looks like no one responded", allowed_mentions=discord.AllowedMentions.none())
 
             end = time.perf_counter()
-            content = message.content.lower().replace("\n", " ")
-            timeout -= round(end - start)
-
-            winners.append({
-                "user": message.author, 
-                "time": end - start, 
-                "wpm" : len(text.split(" ")) / ((end - start) / 60), 
-                "acc" : difflib.SequenceMatcher(None, content, text).ratio() * 100
-            })
+            finished.add(message.author.id)
+            winners.append(self._result(message, end - start, words, accuracies.pop(message.id)))
 
             self._embed.description += self.format_line(len(winners), winners[len(winners) - 1]) + "\n"
             await self._message.edit(embed=self._embed)
@@ -134,6 +233,102 @@ class TypeRacer:
 
         return await ctx.reply(embed=embed, allowed_mentions=discord.AllowedMentions.none())
 
+    async def _wait_for_large_race(
+        self,
+        ctx: commands.Context,
+        check: Callable[[discord.Message], bool],
+        words: int,
+        accuracies: dict[int, float],
+        finished: set[int],
+        *,
+        start: float,
+        deadline: Optional[float],
+        leaderboard_size: int,
+        update_interval: float,
+    ) -> discord.Message:
+        # every finisher is appended in order, the `leaderboard_size` best net WPMs are kept in a min-heap,
+        # and the embed is edited at most once per `update_interval` by a separate task instead of per finisher.
+        # a single listener lives for the whole race and queues every finisher with their finishing time,
+        # a `wait_for` per finisher would leave a gap between two calls in which messages are never checked
+        results: list[dict[str, Any]] = []
+        top: list[tuple[float, int, dict[str, Any]]] = []
+        dirty = asyncio.Event()
+        finishers: asyncio.Queue[tuple[discord.Message, float]] = asyncio.Queue()
+        reactions: set[asyncio.Task] = set()
+
+        async def on_message(message: discord.Message) -> None:
+            if check(message):
+                finished.add(message.author.id)
+                finishers.put_nowait((message, time.perf_counter()))
+
+        def leaderboard() -> list[dict[str, Any]]:
+            return [entry for *_, entry in sorted(top, reverse=True)]
+
+        async def update_embed() -> None:
+            while True:
+                await dirty.wait()
+                dirty.clear()
+                self._embed.description = self.format_leaderboard(leaderboard()) + f"\n\n**{len(results)}** finished"
+                try:
+                    await self._message.edit(embed=self._embed)
+                except discord.HTTPException:
+                    pass
+                await asyncio.sleep(update_interval)
+
+        ctx.bot.add_listener(on_message, "on_message")
+        updater = asyncio.create_task(update_embed())
+        try:
+            while True:
+                try:
+                    remaining = max(deadline - time.perf_counter(), 0) if deadline is not None else None
+                    message, end = await asyncio.wait_for(finishers.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+                result = self._result(message, end - start, words, accuracies.pop(message.id))
+                results.append(result)
+
+                entry = (result["net"], -len(results), result)
+                if len(top) < leaderboard_size:
+                    heapq.heappush(top, entry)
+                else:
+                    heapq.heappushpop(top, entry)
+                dirty.set()
+
+                # only the first finishers get a reaction, so the loop never waits on the API
+                if len(results) in self.EMOJI_MAP:
+                    task = asyncio.create_task(message.add_reaction(self.EMOJI_MAP[len(results)]))
+                    reactions.add(task)
+                    task.add_done_callback(reactions.discard)
+        finally:
+            ctx.bot.remove_listener(on_message, "on_message")
+            updater.cancel()
+
+        if reactions:
+            await asyncio.gather(*reactions, return_exceptions=True)
+
+        if not results:
+            return await ctx.reply("Looks like no one responded", allowed_mentions=discord.AllowedMentions.none())
+
+        board = self.format_leaderboard(leaderboard())
+        embed = discord.Embed(
+            title="Typerace results",
+            description=(
+                f"**{len(results)}** typists finished, full results are attached\n\n"
+                f"**Top {board.count(chr(10)) + 1} by net WPM**\n{board}"
+            ),
+            color=self.embed_color, 
+            timestamp=dt.utcnow()
+        )
+
+        lines = [
+            f"{i}. {x['user']} ({x['user'].id}) | {x['time']:.2f}s | WPM: {x['wpm']:.2f} | ACC: {x['acc']:.2f}% | NET: {x['net']:.2f}"
+            for i, x in enumerate(results, 1)
+        ]
+        file = discord.File(BytesIO("\n".join(lines).encode()), "results.txt")
+
+        return await ctx.reply(embed=embed, file=file, allowed_mentions=discord.AllowedMentions.none())
+
     async def start(
         self, 
         ctx: commands.Context, 
@@ -144,26 +339,29 @@ class TypeRacer:
         timeout: Optional[float] = None, 
         words_mode: bool = False,
         show_author: bool = True,
+        source: Optional[QuoteSource] = None,
+        use_api: bool = False,
+        large_race: bool = False,
+        leaderboard_size: int = 10,
+        update_interval: float = 3.0,
     ) -> discord.Message:
 
         self.embed_color = embed_color
 
         if not words_mode:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.SENTENCE_URL) as r:
-                    if r.ok:
-                        text = await r.json()
-                        text = text.get("content")
-                    else:
-                        raise RuntimeError(f"HTTP request raised an error: {r.status}; {r.reason}")
+            # the bundled corpus by default, `use_api` fetches sentences from `SENTENCE_URL` over the bot's shared source
+            if source is None:
+                source = HTTPQuoteSource.from_bot(ctx.bot, self.SENTENCE_URL) if use_api else CorpusQuoteSource()
+            quote = await source.get_quote()
+            text = quote.content
 
         else:
             text = " ".join(random.choice(self.GRAMMAR_WORDS).lower() for _ in range(15))
 
         if not path_to_text_font:
-            path_to_text_font = fr'{pathlib.Path(__file__).parent}\assets\segoe-ui-semilight-411.ttf'
+            path_to_text_font = DEFAULT_FONT
 
-        buffer = await self._tr_img(text, path_to_text_font)
+        buffer = await self._tr_img(text, path_to_text_font, words_mode=words_mode)
 
         embed = discord.Embed(
             title=embed_title,
@@ -185,4 +383,13 @@ class TypeRacer:
             file=discord.File(buffer, "tr.png")
         )
 
-        return await self.wait_for_tr_response(ctx, text, timeout=timeout)
\ No newline at end of file
+        if large_race and timeout is None:
+            timeout = 60
+
+        return await self.wait_for_tr_response(
+            ctx, text,
+            timeout=timeout,
+            large_race=large_race,
+            leaderboard_size=leaderboard_size,
+            update_interval=update_interval,
+        )
\ No newline at end of file
@@ -4,23 +4,40 @@ from typing import Callable, Union
 
 import functools
 import asyncio
+import os
+import pathlib
+import tempfile
 
 import discord
 
 __all__ = (
     'DiscordColor',
     'DEFAULT_COLOR',
+    'ASSETS_DIR',
     'executor',
     'chunk',
+    'cache_path',
 )
 
 DiscordColor = Union[discord.Color, int]
 
 DEFAULT_COLOR: discord.Color = discord.Color(0x2F3136)
 
+ASSETS_DIR: pathlib.Path = pathlib.Path(__file__).parent / 'assets'
+
+# generated data files (lexicons, lookup tables, asset packs) are written here once,
+# and then memory-mapped by every process, set `DISCORD_GAMES_CACHE` to share them between machines or containers
+CACHE_DIR: pathlib.Path = pathlib.Path(
+    os.environ.get('DISCORD_GAMES_CACHE', pathlib.Path(tempfile.gettempdir()) / 'Discord_Games')
+)
+
 def chunk(iterable: list[int], *, count: int) -> list[list[int]]:
     return [iterable[i:i + count] for i in range(0, len(iterable), count)]
 
+def cache_path(name: str) -> pathlib.Path:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    return CACHE_DIR / name
+
 def executor():
 
     def decorator(func: Callable):
@@ -31,4 +48,4 @@ def executor():
             return loop.run_in_executor(None, partial)
 
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -1,15 +1,18 @@
 from __future__  import annotations
 from typing import Optional
 
-import pathlib
-import random
 from io import BytesIO
+import functools
 
 import discord
 from discord.ext import commands
 from PIL import Image, ImageDraw, ImageFont
 
 from .utils import *
+from .encoding import get_profile, filename, encode as encode_image
+from .lexicon import wordle_lexicon
+from .wordle_engine import encode, score, decode_pattern, ConstraintIndex, SOLVED
+from .wordle_solver import WordleSolver, constraint_index
 
 BORDER = 40
 SQ = 100  
@@ -22,66 +25,155 @@ GRAY = (119, 123, 125)
 ORANGE = (200, 179, 87)
 GREEN = (105, 169, 99)
 
+# colors indexed by the feedback values of `wordle_engine`
+COLORS = (GRAY, ORANGE, GREEN)
+
+# the images below are cached process-wide and shared by every game,
+# they must never be drawn on, only pasted from or copied
+
+@functools.lru_cache(maxsize=None)
+def _get_font() -> ImageFont.FreeTypeFont:
+    try:
+        return ImageFont.truetype('arial.ttf', 70)
+    except OSError:
+        return ImageFont.truetype(str(ASSETS_DIR / 'ClearSans-Bold.ttf'), 70)
+
+@functools.lru_cache(maxsize=None)
+def _get_cell(letter: str, feedback: int) -> Image.Image:
+    cell = Image.new('RGB', (SQ + 1, SQ + 1), COLORS[feedback])
+    cursor = ImageDraw.Draw(cell)
+    cursor.text((SQ/2, SQ/2), letter, font=_get_font(), anchor='mm', fill=(255, 255, 255))
+    return cell
+
+@functools.lru_cache(maxsize=None)
+def _get_blank(rows: int = 6) -> Image.Image:
+    height = BORDER * 2 + SQ * rows + SPACE * (rows - 1)
+    blank = Image.new('RGB', (WIDTH, height), (255, 255, 255))
+    cursor = ImageDraw.Draw(blank)
+
+    x = y = BORDER
+    for _ in range(rows):
+        for _ in range(5):
+            cursor.rectangle((x, y, x+SQ, y+SQ), outline='gray', width=2)
+            x += SQ + SPACE
+        x = BORDER
+        y += SQ + SPACE
+    return blank
+
+@functools.lru_cache(maxsize=None)
+def _get_blank_encoded(rows: int = 6, profile: str = 'png') -> bytes:
+    return encode_image(_get_blank(rows), profile).getvalue()
+
+@functools.lru_cache(maxsize=None)
+def _get_multi_blank(boards: int, rows: int, columns: int) -> Image.Image:
+    blank = _get_blank(rows)
+    width, height = blank.size
+
+    grid = Image.new('RGB', (width * columns, height * -(-boards // columns)), (255, 255, 255))
+    for k in range(boards):
+        grid.paste(blank, ((k % columns) * width, (k // columns) * height))
+    return grid
+
+def _paste_rows(image: Image.Image, guesses: list[tuple[str, int]], *, x: int = BORDER, y: int = BORDER) -> None:
+    # rows are pasted cell by cell, the 78 cached cells are all the state there is,
+    # a cache of whole rows would hold a distinct image for nearly every guess of a busy bot
+    for guess, pattern in guesses:
+        for j, (letter, feedback) in enumerate(zip(guess, decode_pattern(pattern))):
+            image.paste(_get_cell(letter, feedback), (x + j * (SQ + SPACE), y))
+        y += SQ + SPACE
+
+def render_multi(boards: list[list[tuple[str, int]]], *, rows: int, columns: int) -> BytesIO:
+    """
+    Renders the (guess, pattern) rows of every board side by side, `columns` boards per line, as an encoded image.
+    """
+    with _get_multi_blank(len(boards), rows, columns).copy() as img:
+        width = img.width // columns
+        height = BORDER * 2 + SQ * rows + SPACE * (rows - 1)
+
+        for k, guesses in enumerate(boards):
+            x = (k % columns) * width
+            y = (k // columns) * height
+            _paste_rows(img, guesses, x=x + BORDER, y=y + BORDER)
+
+        # the full resolution grid is far larger than discord displays it
+        with img.reduce(2) as small:
+            return encode_image(small)
+
 class Wordle:
 
-    def __init__(self) -> None:
+    def __init__(self, *, hard_mode: bool = False) -> None:
         self.embed_color: Optional[DiscordColor] = None
+        self.hard_mode = hard_mode
+        self.max_guesses: int = 6
+
+        self._valid_words = wordle_lexicon()
+        self.guesses: list[tuple[str, int]] = []
+        self.word: str = self._valid_words.random()
+        self._answer = encode(self.word)
+        self._solver: Optional[WordleSolver] = None
+
+        # bitset of the words still consistent with every guess so far
+        self._index = constraint_index(self._valid_words)
+        self._candidates: int = self._index.full
+
+    @property
+    def remaining(self) -> int:
+        return ConstraintIndex.count(self._candidates)
 
-        self._valid_words = tuple(
-            open(fr'{pathlib.Path(__file__).parent}\assets\words.txt', 'r').read().splitlines()
-        )
-        self._font = ImageFont.truetype('arial.ttf', 70)
-        self.guesses: list[list[dict[str, str]]] = []
-        self.word: str = random.choice(self._valid_words)
+    def is_allowed(self, guess: str) -> bool:
+        if not self.hard_mode:
+            return True
+        return bool((self._candidates >> self._valid_words.index(guess)) & 1)
 
     def parse_guess(self, guess: str) -> bool:
-        self.guesses.append([])
-        for ind, l in enumerate(guess):
-            if l in self.word:
-                color = GREEN if self.word[ind] == l else ORANGE
-            else:
-                color = GRAY
-            self.guesses[-1].append({'letter': l, 'color': color})
+        pattern = int(score(guess, self._answer)[0])
+        self.guesses.append((guess, pattern))
+        self._candidates &= self._index.consistent(guess, pattern)
+
+        if self._solver is not None:
+            self._solver.update(guess, pattern)
+
+        return pattern == SOLVED
+
+    def get_solver(self) -> WordleSolver:
+        if self._solver is None:
+            self._solver = WordleSolver(self._valid_words)
+            for guess, pattern in self.guesses:
+                self._solver.update(guess, pattern)
+        return self._solver
 
-        return guess == self.word
+    @executor()
+    def get_hint(self) -> tuple[str, float]:
+        return self.get_solver().best_guesses()[0]
+
+    def get_remaining(self, limit: int = 30) -> tuple[int, list[str]]:
+        words = [self._valid_words[i] for i in ConstraintIndex.indices(self._candidates, limit)]
+        return self.remaining, words
+
+    def get_embed(self) -> discord.Embed:
+        embed = discord.Embed(title='Wordle!', color=self.embed_color)
+        embed.set_image(url=f'attachment://{filename("wordle")}')
+
+        if self.guesses:
+            embed.set_footer(text=f'{self.remaining} possible words remaining')
+        return embed
 
     @executor()
     def render_image(self) -> BytesIO:
-        with Image.new('RGB', (WIDTH, HEIGHT), (255, 255, 255)) as img:
-            cursor = ImageDraw.Draw(img)
-
-            x = y = BORDER
-            for i in range(6):
-                for j in range(5):
-                    try:
-                        letter = self.guesses[i][j]
-                        color = letter['color']
-                        act_letter = letter['letter']
-                    except (IndexError, KeyError):
-                        cursor.rectangle((x, y, x+SQ, y+SQ), outline='gray', width=2)
-                    else:
-                        cursor.rectangle((x, y, x+SQ, y+SQ), width=0, fill=color)
-                        cursor.text((x+SQ/2, y+SQ/2), act_letter, font=self._font, anchor='mm', fill=(255, 255, 255))
-
-                    x += SQ + SPACE
-                x = BORDER
-                y += SQ + SPACE
-        
-            buf = BytesIO()
-            img.save(buf, 'PNG')
-        buf.seek(0)
-        return buf
+        if not self.guesses:
+            return BytesIO(_get_blank_encoded(profile=get_profile().name))
+
+        with _get_blank().copy() as img:
+            _paste_rows(img, self.guesses)
+            return encode_image(img)
 
     async def start(self, ctx: commands.Context, *, embed_color: DiscordColor = DEFAULT_COLOR) -> Optional[discord.Message]:
 
-        self.emebd_color = embed_color
+        self.embed_color = embed_color
 
         buf = await self.render_image()
 
-        embed = discord.Embed(title='Wordle!', color=self.color)
-        embed.set_image(url='attachment://wordle.png')
-
-        message = await ctx.send(embed=embed, file=discord.File(buf, 'wordle.png'))
+        message = await ctx.send(embed=self.get_embed(), file=discord.File(buf, filename('wordle')))
         
         while True:
             
@@ -93,18 +185,17 @@ class Wordle:
 
             if content not in self._valid_words:
                 await ctx.send('That is not a valid word!')
+            elif not self.is_allowed(content):
+                await ctx.send('Hard mode is on! Your guess must use every hint revealed so far.')
             else:
                 won = self.parse_guess(content)
                 buf = await self.render_image()
 
                 await message.delete()
 
-                embed = discord.Embed(title='Wordle!', color=self.embed_color)
-                embed.set_image(url='attachment://wordle.png')
-
-                message = await ctx.send(embed=embed, file=discord.File(buf, 'wordle.png'))
+                message = await ctx.send(embed=self.get_embed(), file=discord.File(buf, filename('wordle')))
 
                 if won:
                     return await ctx.send('Game Over! You won!')
-                elif len(self.guesses) >= 6:
+                elif len(self.guesses) >= self.max_guesses:
                     return await ctx.send(f'Game Over! You lose, the word was: **{self.word}**')
\ No newline at end of file
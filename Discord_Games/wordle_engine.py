@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+__all__ = (
+    'encode',
+    'score',
+    'decode_pattern',
+    'ConstraintIndex',
+    'SOLVED',
+)
+
+WORD_LENGTH = 5
+
+# feedback for a single letter, a pattern code is the base 3 number
+# whose digit `i` (least significant first) is the feedback for letter `i` of the guess
+ABSENT, PRESENT, CORRECT = range(3)
+PATTERNS = 3 ** WORD_LENGTH
+SOLVED = PATTERNS - 1
+
+_POWERS = 3 ** np.arange(WORD_LENGTH, dtype=np.uint8)
+
+def encode(words: Union[str, Sequence[str]]) -> np.ndarray:
+    """Encodes a word (or a sequence of words) into letter indices from 0 to 25."""
+    if isinstance(words, str):
+        return np.frombuffer(words.encode('ascii'), dtype=np.uint8) - ord('a')
+
+    data = ''.join(words).encode('ascii')
+    return (np.frombuffer(data, dtype=np.uint8) - ord('a')).reshape(-1, WORD_LENGTH)
+
+def score(guess: Union[str, np.ndarray], answers: np.ndarray) -> np.ndarray:
+    """
+    Scores a single guess against every answer in `answers` (an `(N, 5)` array from `encode`),
+    returning an `(N,)` array of pattern codes. 
+
+    A guessed letter is only marked present as many times as it 
+    occurs in the answer outside of the correctly placed letters.
+    """
+    if isinstance(guess, str):
+        guess = encode(guess)
+
+    # work on one contiguous row per letter position, so every operation is vectorized over the answers
+    columns = np.ascontiguousarray(np.atleast_2d(answers).T)
+
+    correct = columns == guess[:, None]
+    unmatched = ~correct
+
+    codes = np.zeros(columns.shape[1], dtype=np.uint8)
+    for i in range(WORD_LENGTH):
+        codes += correct[i] * (_POWERS[i] * CORRECT)
+
+    for i in range(WORD_LENGTH):
+        letter = guess[i]
+
+        # the letter is present if the answer has more unmatched copies of it
+        # than are already claimed by unmatched copies earlier in the guess
+        available = ((columns == letter) & unmatched).sum(axis=0, dtype=np.uint8)
+        claimed = unmatched[:i][guess[:i] == letter].sum(axis=0, dtype=np.uint8)
+
+        codes += (unmatched[i] & (available > claimed)) * _POWERS[i]
+
+    return codes
+
+def decode_pattern(code: int) -> tuple[int, ...]:
+    return tuple((int(code) // 3 ** i) % 3 for i in range(WORD_LENGTH))
+
+class ConstraintIndex:
+    """
+    Bitsets over a word list, bit `k` of every set refers to word `k`.
+
+    `positions[i][letter]` holds the words with `letter` at position `i`,
+    and `at_least[letter][n]` the words containing `letter` at least `n` times,
+    so the words consistent with any feedback are found with a handful of bitwise ANDs.
+    """
+
+    def __init__(self, words: np.ndarray) -> None:
+        self.size = len(words)
+        self.full = (1 << self.size) - 1
+
+        self.positions = [
+            [_to_bitset(words[:, i] == letter) for letter in range(26)] 
+            for i in range(WORD_LENGTH)
+        ]
+
+        counts = [(words == letter).sum(axis=1) for letter in range(26)]
+        self.at_least = [
+            [_to_bitset(counts[letter] >= n) for n in range(WORD_LENGTH + 2)] 
+            for letter in range(26)
+        ]
+
+    def consistent(self, guess: str, pattern: int) -> int:
+        """Returns the bitset of words that would have produced `pattern` for `guess`."""
+        bits = self.full
+        found: dict[int, int] = {}
+        absent: set[int] = set()
+
+        for i, feedback in enumerate(decode_pattern(pattern)):
+            letter = ord(guess[i]) - ord('a')
+
+            if feedback == CORRECT:
+                bits &= self.positions[i][letter]
+            else:
+                bits &= ~self.positions[i][letter]
+
+            if feedback == ABSENT:
+                absent.add(letter)
+            else:
+                found[letter] = found.get(letter, 0) + 1
+
+        for letter, count in found.items():
+            bits &= self.at_least[letter][count]
+
+        # an absent copy means the answer has exactly as many copies as were found
+        for letter in absent:
+            bits &= ~self.at_least[letter][found.get(letter, 0) + 1]
+
+        return bits
+
+    @staticmethod
+    def count(bits: int) -> int:
+        return bin(bits).count('1')
+
+    @staticmethod
+    def indices(bits: int, limit: Optional[int] = None) -> list[int]:
+        found = []
+        while bits and (limit is None or len(found) < limit):
+            lowest = bits & -bits
+            found.append(lowest.bit_length() - 1)
+            bits ^= lowest
+        return found
+
+def _to_bitset(mask: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
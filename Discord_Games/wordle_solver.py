@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from typing import Callable, Optional
+import functools
+import os
+import threading
+
+import numpy as np
+
+from .lexicon import Lexicon, wordle_lexicon
+from .utils import cache_path
+from .wordle_engine import PATTERNS, ConstraintIndex, encode, score
+
+__all__ = (
+    'WordleSolver',
+    'pattern_matrix',
+    'constraint_index',
+)
+
+# upper bound on the number of (guess, candidate) pairs that are counted at once
+CHUNK_SIZE = 1 << 22
+
+_matrices: dict[str, np.ndarray] = {}
+# the entropy of every guess over the full answer set, the ranking of the first guess of every game
+_openings: dict[str, np.ndarray] = {}
+_indexes: dict[str, ConstraintIndex] = {}
+_lock = threading.Lock()
+
+def _build_matrix(lexicon: Lexicon, path: str) -> None:
+    words = encode(list(lexicon))
+    tmp = f'{path}.{os.getpid()}.tmp'
+
+    matrix = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.uint8, shape=(len(words), len(words)))
+    for i, guess in enumerate(words):
+        matrix[i] = score(guess, words)
+
+    matrix.flush()
+    del matrix
+    os.replace(tmp, path)
+
+def _build_opening(matrix: np.ndarray, path: str) -> None:
+    entropies = _entropies(matrix, np.arange(matrix.shape[1]))
+    tmp = f'{path}.{os.getpid()}.tmp'
+
+    with open(tmp, 'wb') as f:
+        np.save(f, entropies)
+    os.replace(tmp, path)
+
+def _load(path: str, build: Callable[[str], None], **kwargs) -> np.ndarray:
+    try:
+        return np.load(path, **kwargs)
+    except (OSError, ValueError):
+        build(path)
+        return np.load(path, **kwargs)
+
+def pattern_matrix(lexicon: Optional[Lexicon] = None) -> np.ndarray:
+    """
+    Returns the read-only, memory-mapped `(guesses, answers)` matrix of pattern codes for `lexicon`,
+    row and column indices are the indices of the words in the lexicon.
+    The `.npy` file is built next to the lexicon the first time it is needed,
+    together with the entropies of the opening guesses.
+    """
+    lexicon = lexicon or wordle_lexicon()
+    name = lexicon.path.stem
+
+    if (matrix := _matrices.get(name)) is not None:
+        return matrix
+
+    with _lock:
+        if (matrix := _matrices.get(name)) is None:
+            path = str(cache_path(f'{name}-patterns.npy'))
+            matrix = _load(path, functools.partial(_build_matrix, lexicon), mmap_mode='r')
+
+            path = str(cache_path(f'{name}-opening.npy'))
+            _openings[name] = _load(path, functools.partial(_build_opening, matrix))
+            _matrices[name] = matrix
+    return matrix
+
+def constraint_index(lexicon: Optional[Lexicon] = None) -> ConstraintIndex:
+    """Returns the process-wide `ConstraintIndex` over the words of `lexicon`."""
+    lexicon = lexicon or wordle_lexicon()
+    name = lexicon.path.stem
+
+    if (index := _indexes.get(name)) is not None:
+        return index
+
+    with _lock:
+        if (index := _indexes.get(name)) is None:
+            index = _indexes[name] = ConstraintIndex(encode(list(lexicon)))
+    return index
+
+def _entropies(matrix: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    guesses = len(matrix)
+    entropies = np.empty(guesses, dtype=np.float64)
+    step = max(1, CHUNK_SIZE // len(candidates))
+
+    for start in range(0, guesses, step):
+        patterns = matrix[start:start + step, candidates].astype(np.int32)
+        rows = len(patterns)
+        patterns += (np.arange(rows, dtype=np.int32) * PATTERNS)[:, None]
+
+        counts = np.bincount(patterns.ravel(), minlength=rows * PATTERNS).reshape(rows, PATTERNS)
+        probabilities = counts / len(candidates)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            entropies[start:start + rows] = -np.nansum(probabilities * np.log2(probabilities), axis=1)
+
+    return entropies
+
+@functools.lru_cache(maxsize=256)
+def _rank(name: str, packed: bytes, size: int, count: int) -> tuple[tuple[int, float], ...]:
+    # cached on the packed candidate mask, games reaching the same position share the result
+    matrix = _matrices[name]
+    candidates = np.flatnonzero(np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=size))
+
+    if len(candidates) <= 2:
+        return tuple((int(index), float(len(candidates) > 1)) for index in candidates[:count])
+
+    if len(candidates) == size:
+        # the opening position, ranked once when the matrix was built
+        entropies = _openings[name]
+    else:
+        entropies = _entropies(matrix, candidates)
+    # break ties in favour of words that could still be the answer
+    ranking = entropies.copy()
+    ranking[candidates] += 1e-6
+
+    best = np.argsort(-ranking, kind='stable')[:count]
+    return tuple((int(index), float(entropies[index])) for index in best)
+
+class WordleSolver:
+    """
+    Tracks the answers still consistent with the feedback of a game,
+    and ranks guesses by the expected information (in bits) they reveal about the answer.
+    """
+
+    def __init__(self, lexicon: Optional[Lexicon] = None) -> None:
+        self.lexicon = lexicon or wordle_lexicon()
+        self.matrix = pattern_matrix(self.lexicon)
+        self.candidates = np.ones(len(self.lexicon), dtype=bool)
+
+    @property
+    def remaining(self) -> int:
+        return int(np.count_nonzero(self.candidates))
+
+    def update(self, guess: str, pattern: int) -> None:
+        index = self.lexicon.index(guess)
+        if index >= 0:
+            self.candidates &= self.matrix[index] == pattern
+
+    def remaining_words(self, limit: Optional[int] = None) -> list[str]:
+        indices = np.flatnonzero(self.candidates)[:limit]
+        return [self.lexicon[int(index)] for index in indices]
+
+    def best_guesses(self, count: int = 1) -> list[tuple[str, float]]:
+        packed = np.packbits(self.candidates).tobytes()
+        ranked = _rank(self.lexicon.path.stem, packed, len(self.candidates), count)
+        return [(self.lexicon[index], entropy) for index, entropy in ranked]